@@ -9,8 +9,13 @@
     from engine import Engine
     from entity import Actor, Entity, Item
 
+# How far away the noise of a melee attack wakes dormant actors.
+MELEE_NOISE_RADIUS = 6
+
 
 class Action:
+    __slots__ = ("entity",)
+
     def __init__(self, entity: Actor) -> None:
         super().__init__()
         self.entity = entity
@@ -43,17 +48,16 @@ def perform(self) -> None:
         actor_location_y = self.entity.y
         inventory = self.entity.inventory
 
-        for item in self.engine.game_map.items:
-            if actor_location_x == item.x and actor_location_y == item.y:
-                if len(inventory.items) >= inventory.capacity:
-                    raise exceptions.Impossible("Your inventory is full.")
+        for item in self.engine.game_map.get_items_at_location(actor_location_x, actor_location_y):
+            if len(inventory.items) >= inventory.capacity:
+                raise exceptions.Impossible("Your inventory is full.")
 
-                self.engine.game_map.entities.remove(item)
-                item.parent = self.entity.inventory
-                inventory.items.append(item)
+            self.engine.game_map.remove_entity(item)
+            item.parent = self.entity.inventory
+            inventory.items.append(item)
 
-                self.engine.message_log.add_message(f"You picked up the {item.name}!")
-                return
+            self.engine.message_log.add_message(f"You picked up the {item.name}!")
+            return
 
         raise exceptions.Impossible("There is nothing here to pick up.")
 
@@ -158,6 +162,9 @@ def perform(self) -> None:
         else:
             self.engine.message_log.add_message(f"{attack_desc} but does no damage.", attack_color)
 
+        # The noise of the fight wakes up anything dormant nearby.
+        self.engine.game_map.wake_actors(self.entity.x, self.entity.y, MELEE_NOISE_RADIUS)
+
 
 class MovementAction(ActionWithDirection):
     def perform(self) -> None:
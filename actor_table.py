@@ -0,0 +1,68 @@
+"""Actor state in parallel NumPy arrays, for queries over all of the actors on a map at once."""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, List, Optional
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from entity import Actor
+
+
+class ActorTable:
+    """The positions, hit points and flags of a map's actors as parallel arrays.
+
+    Each actor gets a stable integer handle when it is added: its row in the arrays, which is also its index in
+    `actors`.  Rows of removed actors have `used` cleared and are reused by actors added later.
+
+    The arrays are kept up to date by GameMap, `Fighter.hp` and the setters of `Actor.ai` and
+    `Entity.blocks_movement`.  They must not be modified by anything else.  `dormant` is only kept by GameMap.
+    """
+
+    def __init__(self, capacity: int = 32):
+        self.actors: List[Optional[Actor]] = [None] * capacity
+        self.x = np.zeros(capacity, dtype=np.int32)
+        self.y = np.zeros(capacity, dtype=np.int32)
+        self.hp = np.zeros(capacity, dtype=np.int32)
+        self.blocks = np.zeros(capacity, dtype=bool)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.dormant = np.zeros(capacity, dtype=bool)  # True for actors which are not scheduled until woken.
+        self.used = np.zeros(capacity, dtype=bool)  # True for the rows which hold an actor.
+        self._free = list(range(capacity - 1, -1, -1))  # Unused rows, the lowest row is taken first.
+
+    def __len__(self) -> int:
+        return len(self.actors) - len(self._free)
+
+    def add(self, actor: Actor) -> int:
+        """Add an actor and return its handle."""
+        if not self._free:
+            self._grow()
+        handle = self._free.pop()
+        self.actors[handle] = actor
+        self.used[handle] = True
+        self.update(handle, actor)
+        return handle
+
+    def remove(self, handle: int) -> None:
+        """Remove the actor with this handle, freeing the handle for reuse."""
+        self.actors[handle] = None
+        self.used[handle] = self.alive[handle] = self.blocks[handle] = self.dormant[handle] = False
+        self._free.append(handle)
+
+    def update(self, handle: int, actor: Actor) -> None:
+        """Copy the current state of `actor` into its row."""
+        self.x[handle] = actor.x
+        self.y[handle] = actor.y
+        self.hp[handle] = actor.fighter.hp
+        self.blocks[handle] = actor.blocks_movement
+        self.alive[handle] = actor.is_alive
+
+    def _grow(self) -> None:
+        """Double the capacity of this table."""
+        capacity = len(self.actors)
+        for name in ("x", "y", "hp", "blocks", "alive", "dormant", "used"):
+            array = getattr(self, name)
+            setattr(self, name, np.concatenate([array, np.zeros_like(array)]))
+        self.actors += [None] * capacity
+        self._free = list(range(capacity * 2 - 1, capacity - 1, -1))
@@ -0,0 +1,84 @@
+"""Periodically save the game without blocking input or rendering."""
+from __future__ import annotations
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Optional
+import time
+import traceback
+
+import input_handlers
+import savefile
+
+if TYPE_CHECKING:
+    from engine import Engine
+
+
+class Autosaver:
+    """Saves the active game every `every_turns` turns or `every_seconds` seconds, whichever comes first.
+
+    Only a snapshot of the game is taken on the calling thread, it is encoded, compressed and written on a
+    background thread.  A save is skipped while the previous one is still being written, the next poll picks it up.
+    """
+
+    def __init__(
+        self,
+        filename: str,
+        *,
+        every_turns: int = 50,
+        every_seconds: float = 60.0,
+        codec: str = savefile.DEFAULT_CODEC,
+    ):
+        self.filename = filename
+        self.every_turns = every_turns
+        self.every_seconds = every_seconds
+        self.codec = codec
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="autosave")
+        self._pending: Optional[Future[None]] = None
+        self._engine: Optional[Engine] = None
+        self._last_turn = 0
+        self._last_time = 0.0
+
+    def poll(self, handler: input_handlers.BaseEventHandler) -> bool:
+        """Start saving the game of `handler` if a save is due.
+
+        Games are only saved from the main game handler while the player is alive.
+        Returns True if a save was started.
+        """
+        if not isinstance(handler, input_handlers.MainGameEventHandler) or not handler.engine.player.is_alive:
+            return False
+        engine = handler.engine
+        now = time.monotonic()
+        if engine is not self._engine:
+            # A new or loaded game, start counting from here.
+            self._engine = engine
+            self._last_turn = engine.turn_count
+            self._last_time = now
+            return False
+
+        if self._pending is not None:
+            if not self._pending.done():
+                return False
+            self._report_error(self._pending)
+            self._pending = None
+
+        turns = engine.turn_count - self._last_turn
+        if turns < self.every_turns and not (turns and now - self._last_time >= self.every_seconds):
+            return False
+
+        self._pending = self._executor.submit(savefile.write, savefile.snapshot(engine), self.filename, self.codec)
+        self._last_turn = engine.turn_count
+        self._last_time = now
+        return True
+
+    def wait(self) -> None:
+        """Block until the pending save, if any, is written."""
+        if self._pending is not None:
+            self._pending.exception()  # Waits without raising.
+            self._report_error(self._pending)
+            self._pending = None
+
+    @staticmethod
+    def _report_error(future: Future[None]) -> None:
+        exc = future.exception()
+        if exc is not None:
+            traceback.print_exception(type(exc), exc, exc.__traceback__)  # Print to stderr.
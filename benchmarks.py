@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""Performance benchmarks for the game's hot paths.
+
+Results are written to JSON and can be compared against a stored baseline::
+
+    python benchmarks.py --output bench.json --compare benchmark_baseline.json
+
+Timings depend on the machine, so the baseline should be refreshed (with `--save-baseline`) on the machine which
+runs the comparison.
+"""
+
+from __future__ import annotations
+
+from functools import partial
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+import argparse
+import atexit
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from tcod.console import Console
+import numpy as np
+
+from engine import Engine
+import entity_factories
+import procgen
+import setup_game
+
+BASELINE_FILE = "benchmark_baseline.json"
+
+DEFAULT_MAP_SIZES = ((80, 43), (200, 120))
+DEFAULT_ENTITY_COUNTS = (10, 100)
+DEFAULT_MESSAGE_COUNTS = (100, 10_000)
+
+Benchmark = Tuple[str, Dict[str, Any], Callable[[], Callable[[], object]]]
+"""A benchmark name, its parameters, and a setup function returning the callable to time."""
+
+
+def rooms_for_map(map_width: int, map_height: int) -> int:
+    """Return a room budget which keeps larger maps as dense as the default 80x43 map with 30 rooms."""
+    return max(1, map_width * map_height // 115)
+
+
+def new_engine(map_width: int, map_height: int, monsters: int = 0) -> Engine:
+    """Return a new game on a map of the given size with `monsters` extra orcs spread over its floor."""
+    engine = setup_game.new_game(
+        seed=0,
+        map_width=map_width,
+        map_height=map_height,
+        max_rooms=rooms_for_map(map_width, map_height),
+        prefetch_floors=False,  # Background work would skew the timings.
+    )
+    # Keep the player alive no matter how many monsters attack it.
+    engine.player.fighter.max_hp = engine.player.fighter.hp = 10**9
+
+    game_map = engine.game_map
+    floor_xs, floor_ys = np.nonzero(game_map.tiles["walkable"])
+    for i in random.Random(0).sample(range(len(floor_xs)), k=min(monsters, len(floor_xs))):
+        x, y = int(floor_xs[i]), int(floor_ys[i])
+        if not game_map.get_blocking_entity_at_location(x, y):
+            entity_factories.orc.spawn(game_map, x, y)
+    engine.update_fov()
+    return engine
+
+
+def bench_generate_dungeon(map_width: int, map_height: int) -> Callable[[], object]:
+    engine = new_engine(map_width, map_height)
+    return lambda: procgen.generate_dungeon(
+        max_rooms=rooms_for_map(map_width, map_height),
+        room_min_size=6,
+        room_max_size=10,
+        map_width=map_width,
+        map_height=map_height,
+        engine=engine,
+    )
+
+
+def bench_update_fov(map_width: int, map_height: int) -> Callable[[], object]:
+    engine = new_engine(map_width, map_height)
+    floor_xs, floor_ys = np.nonzero(engine.game_map.tiles["walkable"])
+    spots = [(int(x), int(y)) for x, y in zip(floor_xs, floor_ys)]
+    rng = random.Random(0)
+
+    def update_fov() -> None:
+        # Move the player each call so that the FOV always needs to be recomputed.
+        engine.player.place(*rng.choice(spots))
+        engine.update_fov()
+
+    return update_fov
+
+
+def bench_render_map(map_width: int, map_height: int, entities: int) -> Callable[[], object]:
+    engine = new_engine(map_width, map_height, monsters=entities)
+    engine.game_map.explored[:] = True
+    console = Console(map_width, map_height, order="F")
+    return lambda: engine.game_map.render(console)
+
+
+def bench_render_moving_map(map_width: int, map_height: int, entities: int) -> Callable[[], object]:
+    engine = new_engine(map_width, map_height, monsters=entities)
+    engine.game_map.explored[:] = True
+    console = Console(map_width, map_height, order="F")
+    rng = random.Random(0)
+    steps = [(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1) if dx or dy]
+
+    def render_moving_map() -> None:
+        # Walk the player around so that each frame has a new FOV, as while exploring.
+        game_map, player = engine.game_map, engine.player
+        dx, dy = rng.choice(steps)
+        x, y = player.x + dx, player.y + dy
+        if game_map.tiles["walkable"][x, y] and not game_map.get_blocking_entity_at_location(x, y):
+            player.move(dx, dy)
+        engine.update_fov()
+        game_map.render(console)
+
+    return render_moving_map
+
+
+def bench_enemy_turns(map_width: int, map_height: int, entities: int) -> Callable[[], object]:
+    engine = new_engine(map_width, map_height, monsters=entities)
+    engine.game_map.visible[:] = True  # Every monster can see, and will chase, the player.
+    return engine.handle_enemy_turns
+
+
+def bench_render_messages(messages: int) -> Callable[[], object]:
+    engine = new_engine(80, 43)
+    for i in range(messages):
+        engine.message_log.add_message(f"Message number {i}, which is long enough to be wrapped over two lines.")
+    console = Console(80, 50, order="F")
+    return lambda: engine.message_log.render(console=console, x=21, y=45, width=40, height=5)
+
+
+def bench_save_load(map_width: int, map_height: int, entities: int) -> Callable[[], object]:
+    engine = new_engine(map_width, map_height, monsters=entities)
+    fd, filename = tempfile.mkstemp(suffix=".sav")
+    os.close(fd)
+    atexit.register(os.remove, filename)
+
+    def save_load() -> None:
+        engine.save_as(filename)
+        setup_game.load_game(filename)
+
+    return save_load
+
+
+def bytes_per_orc(count: int = 1000) -> float:
+    """Return the memory allocated per orc spawned onto a large map, as traced by tracemalloc."""
+    game_map = new_engine(200, 120).game_map
+    floor_xs, floor_ys = np.nonzero(game_map.tiles["walkable"])
+    spots = [(int(x), int(y)) for x, y in zip(floor_xs, floor_ys)]
+    spots = [(x, y) for x, y in spots if not game_map.get_entities_at_location(x, y)][:count]
+    orcs = []
+
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        for x, y in spots:
+            orcs.append(entity_factories.orc.spawn(game_map, x, y))
+        after, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return (after - before) / len(orcs)
+
+
+def collect_benchmarks(
+    map_sizes: Iterable[Tuple[int, int]] = DEFAULT_MAP_SIZES,
+    entity_counts: Iterable[int] = DEFAULT_ENTITY_COUNTS,
+    message_counts: Iterable[int] = DEFAULT_MESSAGE_COUNTS,
+) -> List[Benchmark]:
+    """Return the parameterized benchmark cases."""
+    benchmarks: List[Benchmark] = []
+    entity_counts = list(entity_counts)
+    for width, height in map_sizes:
+        size = f"{width}x{height}"
+        params: Dict[str, Any] = {"map_width": width, "map_height": height}
+        benchmarks.append((f"generate_dungeon[{size}]", params, partial(bench_generate_dungeon, width, height)))
+        benchmarks.append((f"update_fov[{size}]", params, partial(bench_update_fov, width, height)))
+        for count in entity_counts:
+            params = {"map_width": width, "map_height": height, "entities": count}
+            for name, setup in [
+                ("render_map", bench_render_map),
+                ("render_moving_map", bench_render_moving_map),
+                ("handle_enemy_turns", bench_enemy_turns),
+                ("save_load", bench_save_load),
+            ]:
+                benchmarks.append((f"{name}[{size},{count}]", params, partial(setup, width, height, count)))
+    for count in message_counts:
+        benchmarks.append((f"render_messages[{count}]", {"messages": count}, partial(bench_render_messages, count)))
+    return benchmarks
+
+
+def time_callable(func: Callable[[], object], repeat: int, min_time: float) -> List[float]:
+    """Return `repeat` measurements of the seconds per call of `func`.
+
+    Each measurement calls `func` in a loop for at least `min_time` seconds.
+    """
+    func()  # Warm up.
+    results = []
+    for _ in range(repeat):
+        calls = 0
+        start = time.perf_counter()
+        while True:
+            func()
+            calls += 1
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_time:
+                break
+        results.append(elapsed / calls)
+    return results
+
+
+def run_benchmarks(
+    benchmarks: Sequence[Benchmark], repeat: int = 5, min_time: float = 0.05, verbose: bool = False
+) -> Dict[str, Any]:
+    """Run the benchmarks and return their results as JSON compatible data."""
+    results: Dict[str, Any] = {}
+    for name, params, setup in benchmarks:
+        timings = time_callable(setup(), repeat, min_time)
+        results[name] = {
+            "params": params,
+            "median": statistics.median(timings),
+            "min": min(timings),
+        }
+        if verbose:
+            print(f"{name}: {results[name]['median'] * 1000:.3f}ms", file=sys.stderr)
+    memory = {"bytes_per_orc": bytes_per_orc()}
+    if verbose:
+        print(f"bytes_per_orc: {memory['bytes_per_orc']:.0f}", file=sys.stderr)
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "benchmarks": results,
+        "memory": memory,
+    }
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Return a description of each result which is worse than its baseline by more than `tolerance`."""
+    regressions = []
+    for name, result in results["benchmarks"].items():
+        base = baseline["benchmarks"].get(name)
+        if base is None:
+            continue
+        ratio = result["median"] / base["median"]
+        if ratio > 1 + tolerance:
+            regressions.append(
+                f"{name}: {result['median'] * 1000:.3f}ms vs baseline {base['median'] * 1000:.3f}ms ({ratio:.2f}x)"
+            )
+    for name, value in results.get("memory", {}).items():
+        base_value = baseline.get("memory", {}).get(name)
+        if base_value and value / base_value > 1 + tolerance:
+            regressions.append(f"{name}: {value:.0f} vs baseline {base_value:.0f} ({value / base_value:.2f}x)")
+    return regressions
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run the game's performance benchmarks.")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", metavar="BASELINE", help="flag benchmarks slower than this baseline JSON file")
+    parser.add_argument("--save-baseline", action="store_true", help=f"write the results to {BASELINE_FILE}")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown before flagging, 0.25=25%%")
+    parser.add_argument("--map-size", action="append", help="map size as WIDTHxHEIGHT, can be repeated")
+    parser.add_argument("--entities", type=int, action="append", help="entity count, can be repeated")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    map_sizes: Iterable[Tuple[int, int]] = DEFAULT_MAP_SIZES
+    if args.map_size:
+        map_sizes = [(int(w), int(h)) for w, h in (size.split("x") for size in args.map_size)]
+    results = run_benchmarks(
+        collect_benchmarks(map_sizes, args.entities or DEFAULT_ENTITY_COUNTS), repeat=args.repeat, verbose=True
+    )
+
+    for filename in [args.output, BASELINE_FILE if args.save_baseline else None]:
+        if filename:
+            with open(filename, "w") as f:
+                json.dump(results, f, indent=4)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
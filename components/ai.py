@@ -1,37 +1,39 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, List, Optional, Tuple
-import random
+from typing import TYPE_CHECKING, List, Optional, Tuple, TypeVar
 
 import numpy as np
 import tcod
 
 from actions import Action, BumpAction, MeleeAction, MovementAction, WaitAction
+from game_map import SLEEP_DISTANCE
+from path_cache import EMPTY_PATH, Path
+from slots import shallow_copy
 
 if TYPE_CHECKING:
     from entity import Actor
 
+T = TypeVar("T", bound="BaseAI")
+
 
 class BaseAI(Action):
+    __slots__ = ()
+
     def perform(self) -> None:
         raise NotImplementedError()
 
-    def get_path_to(self, dest_x: int, dest_y: int) -> List[Tuple[int, int]]:
-        """Compute and return a path to the target position.
+    def copy_for(self: T, entity: Actor) -> T:
+        """Return a shallow copy of this AI controlling `entity`."""
+        clone = shallow_copy(self)
+        clone.entity = entity
+        return clone
 
-        If there is no valid path then returns an empty list.
+    def compute_path_to(self, dest_x: int, dest_y: int) -> np.ndarray:
+        """Compute and return the positions along a path to the target position, starting with this entity's own.
+
+        The positions are returned as a (length, 2) array, which only holds the starting point if there is no path.
         """
-        # Copy the walkable array.
-        cost = np.array(self.entity.gamemap.tiles["walkable"], dtype=np.int8)
-
-        for entity in self.entity.gamemap.entities:
-            # Check that an enitiy blocks movement and the cost isn't zero (blocking.)
-            if entity.blocks_movement and cost[entity.x, entity.y]:
-                # Add to the cost of a blocked position.
-                # A lower number means more enemies will crowd behind each other in
-                # hallways.  A higher number means enemies will take longer paths in
-                # order to surround the player.
-                cost[entity.x, entity.y] += 10
+        cost = self.entity.gamemap.get_path_cost()
 
         # Create a graph from the cost array and pass that graph to a new pathfinder.
         graph = tcod.path.SimpleGraph(cost=cost, cardinal=2, diagonal=3)
@@ -39,17 +41,70 @@ def get_path_to(self, dest_x: int, dest_y: int) -> List[Tuple[int, int]]:
 
         pathfinder.add_root((self.entity.x, self.entity.y))  # Start position.
 
-        # Compute the path to the destination and remove the starting point.
-        path: List[List[int]] = pathfinder.path_to((dest_x, dest_y))[1:].tolist()
+        return pathfinder.path_to((dest_x, dest_y))
+
+    def get_path_to(self, dest_x: int, dest_y: int) -> List[Tuple[int, int]]:
+        """Compute and return a path to the target position.
+
+        If there is no valid path then returns an empty list.
+        """
+        # Remove the starting point.
+        path: List[List[int]] = self.compute_path_to(dest_x, dest_y)[1:].tolist()
 
         # Convert from List[List[int]] to List[Tuple[int, int]].
         return [(index[0], index[1]) for index in path]
 
+    def compute_path_to_player(self) -> np.ndarray:
+        """Return the positions along a path to the player, like `compute_path_to`.
+
+        The path is found by walking downhill on the distance field shared by every enemy this turn.
+        """
+        pathfinder = self.engine.get_player_pathfinder()
+
+        # Follow the distance field from this entity to the player.
+        return pathfinder.path_from((self.entity.x, self.entity.y))
+
+    def get_cached_path_to_player(self) -> Path:
+        """Return a path from this actor to the player, from its start to its goal.
+
+        The path is taken from the path cache of the map if this or any other actor found it before and it's still
+        walkable, otherwise it's computed and cached.  Returns EMPTY_PATH if there is no path.
+        """
+        game_map = self.entity.gamemap
+        start = self.entity.x, self.entity.y
+        goal = self.engine.player.x, self.engine.player.y
+        path = game_map.path_cache.get(start, goal, game_map.path_cost)
+        if path is not None:
+            return path
+        if self.engine.shared_enemy_pathing:
+            positions = self.compute_path_to_player()
+        else:
+            positions = self.compute_path_to(*goal)
+        return game_map.path_cache.put(positions, game_map.path_cost)
+
 
 class HostileEnemy(BaseAI):
+    __slots__ = ("path", "path_index")
+
     def __init__(self, entity: Actor):
         super().__init__(entity)
-        self.path: List[Tuple[int, int]] = []
+        # The path being followed, which may be shared with the path cache and other enemies, and the index of the
+        # next position on it.
+        self.path: Path = EMPTY_PATH
+        self.path_index = 0
+
+    def copy_for(self, entity: Actor) -> HostileEnemy:
+        clone = super().copy_for(entity)
+        clone.path = EMPTY_PATH
+        clone.path_index = 0
+        return clone
+
+    def is_following_path_to(self, goal: Tuple[int, int]) -> bool:
+        """Return True if this enemy is part way along its path to `goal`, and the rest of it is still walkable."""
+        path, index = self.path, self.path_index
+        if not path or path[-1] != goal or path[index - 1] != (self.entity.x, self.entity.y):
+            return False
+        return self.entity.gamemap.path_cache.follow(path, index, self.entity.gamemap.path_cost)
 
     def perform(self) -> None:
         target = self.engine.player
@@ -61,10 +116,18 @@ def perform(self) -> None:
             if distance <= 1:
                 return MeleeAction(self.entity, dx, dy).perform()
 
-            self.path = self.get_path_to(target.x, target.y)
+            if not self.is_following_path_to((target.x, target.y)):
+                self.path = self.get_cached_path_to_player()
+                self.path_index = 1
 
-        if self.path:
-            dest_x, dest_y = self.path.pop(0)
+        has_path = self.path_index < len(self.path)
+        if not has_path and distance > SLEEP_DISTANCE:
+            # Far away and unaware of the player, stop taking turns until the player comes closer.
+            self.entity.gamemap.set_dormant(self.entity)
+
+        if has_path:
+            dest_x, dest_y = self.path[self.path_index]
+            self.path_index += 1
             return MovementAction(
                 self.entity,
                 dest_x - self.entity.x,
@@ -80,12 +143,19 @@ class ConfusedEnemy(BaseAI):
     If an actor occupies a tile it is randomly moving into, it will attack.
     """
 
+    __slots__ = ("previous_ai", "turns_remaining")
+
     def __init__(self, entity: Actor, previous_ai: Optional[BaseAI], turns_remaining: int):
         super().__init__(entity)
 
         self.previous_ai = previous_ai
         self.turns_remaining = turns_remaining
 
+    def copy_for(self, entity: Actor) -> ConfusedEnemy:
+        clone = super().copy_for(entity)
+        clone.previous_ai = self.previous_ai.copy_for(entity) if self.previous_ai else None
+        return clone
+
     def perform(self) -> None:
         # Revert the AI back to the original state if the effect has run its course.
         if self.turns_remaining <= 0:
@@ -93,7 +163,7 @@ def perform(self) -> None:
             self.entity.ai = self.previous_ai
         else:
             # Pick a random direction
-            direction_x, direction_y = random.choice(
+            direction_x, direction_y = self.entity.gamemap.rng.choice(
                 [
                     (-1, -1),  # Northwest
                     (0, -1),  # North
@@ -1,14 +1,20 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, TypeVar
+
+from slots import shallow_copy
 
 if TYPE_CHECKING:
     from engine import Engine
     from entity import Entity
     from game_map import GameMap
 
+T = TypeVar("T", bound="BaseComponent")
+
 
 class BaseComponent:
+    __slots__ = ("parent",)
+
     parent: Entity  # Owning entity instance.
 
     @property
@@ -18,3 +24,9 @@ def gamemap(self) -> GameMap:
     @property
     def engine(self) -> Engine:
         return self.gamemap.engine
+
+    def copy_for(self: T, parent: Entity) -> T:
+        """Return a shallow copy of this component owned by `parent`."""
+        clone = shallow_copy(self)
+        clone.parent = parent
+        return clone
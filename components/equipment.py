@@ -6,16 +6,31 @@
 from equipment_types import EquipmentType
 
 if TYPE_CHECKING:
-    from entity import Actor, Item
+    from entity import Actor, Entity, Item
 
 
 class Equipment(BaseComponent):
+    __slots__ = ("weapon", "armor")
+
     parent: Actor
 
     def __init__(self, weapon: Optional[Item] = None, armor: Optional[Item] = None):
         self.weapon = weapon
         self.armor = armor
 
+    def copy_for(self, parent: Entity) -> Equipment:
+        """Return a copy of this component owned by `parent`, equipping the copies of the equipped items.
+
+        `parent.inventory` must already be a copy of this component's parent's inventory.
+        """
+        clone = super().copy_for(parent)
+        items, item_copies = self.parent.inventory.items, clone.parent.inventory.items
+        if self.weapon is not None:
+            clone.weapon = item_copies[items.index(self.weapon)]
+        if self.armor is not None:
+            clone.armor = item_copies[items.index(self.armor)]
+        return clone
+
     @property
     def defense_bonus(self) -> int:
         bonus = 0
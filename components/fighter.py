@@ -11,6 +11,8 @@
 
 
 class Fighter(BaseComponent):
+    __slots__ = ("max_hp", "_hp", "base_defense", "base_power")
+
     parent: Actor
 
     def __init__(self, hp: int, base_defense: int, base_power: int):
@@ -26,6 +28,7 @@ def hp(self) -> int:
     @hp.setter
     def hp(self, value: int) -> None:
         self._hp = max(0, min(value, self.max_hp))
+        self.parent.update_table_row()
         if self._hp == 0 and self.parent.ai:
             self.die()
 
@@ -59,6 +62,16 @@ def die(self) -> None:
             death_message = f"{self.parent.name} is dead!"
             death_message_color = color.enemy_die
 
+        self.leave_corpse()
+        self.parent.gamemap.scheduler.remove(self.parent)
+        self.parent.gamemap.dirty = True
+
+        self.engine.message_log.add_message(death_message, death_message_color)
+
+        self.engine.player.level.add_xp(self.parent.level.xp_given)
+
+    def leave_corpse(self) -> None:
+        """Turn the parent actor into an inert corpse."""
         self.parent.char = "%"
         self.parent.color = (191, 0, 0)
         self.parent.blocks_movement = False
@@ -66,10 +79,6 @@ def die(self) -> None:
         self.parent.name = f"remains of {self.parent.name}"
         self.parent.render_order = RenderOrder.CORPSE
 
-        self.engine.message_log.add_message(death_message, death_message_color)
-
-        self.engine.player.level.add_xp(self.parent.level.xp_given)
-
     def heal(self, amount: int) -> int:
         if self.hp == self.max_hp:
             return 0
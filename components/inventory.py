@@ -5,16 +5,27 @@
 from components.base_component import BaseComponent
 
 if TYPE_CHECKING:
-    from entity import Actor, Item
+    from entity import Actor, Entity, Item
 
 
 class Inventory(BaseComponent):
+    __slots__ = ("capacity", "items")
+
     parent: Actor
 
     def __init__(self, capacity: int):
         self.capacity = capacity
         self.items: List[Item] = []
 
+    def copy_for(self, parent: Entity) -> Inventory:
+        clone = super().copy_for(parent)
+        clone.items = []
+        for item in self.items:
+            item_copy = item.copy()
+            item_copy.parent = clone
+            clone.items.append(item_copy)
+        return clone
+
     def drop(self, item: Item) -> None:
         """
         Removes an item from the inventory and restores it to the game map, at the player's current location.
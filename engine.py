@@ -1,19 +1,20 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
-import lzma
-import pickle
+from typing import TYPE_CHECKING, Optional, Tuple
 
 from tcod.console import Console
-from tcod.map import compute_fov
+import tcod
 
+from game_map import WAKE_RADIUS
 from message_log import MessageLog
 import exceptions
 import render_functions
+import timing
 
 if TYPE_CHECKING:
     from entity import Actor
     from game_map import GameMap, GameWorld
+    from journal import Journal
 
 
 class Engine:
@@ -22,28 +23,64 @@ class Engine:
 
     def __init__(self, player: Actor):
         self.message_log = MessageLog()
-        self.mouse_location = (0, 0)
+        self._mouse_location = (0, 0)
+        self.dirty = True  # True if the HUD changed since it was last rendered.
         self.player = player
+        self.turn_count = 0  # The number of turns played, incremented at the end of each turn.
+        # If True then hostile enemies share one distance field rooted at the player each turn.
+        self.shared_enemy_pathing = True
+        self._player_pathfinder: Optional[tcod.path.Pathfinder] = None
+        self.journal: Optional[Journal] = None  # If set then the player's actions are recorded to it.
 
+    @property
+    def mouse_location(self) -> Tuple[int, int]:
+        return self._mouse_location
+
+    @mouse_location.setter
+    def mouse_location(self, value: Tuple[int, int]) -> None:
+        if value != self._mouse_location:
+            self._mouse_location = value
+            self.dirty = True
+
+    def is_dirty(self) -> bool:
+        """Return True if anything rendered by `render` changed since it was last called."""
+        return self.dirty or self.game_map.dirty or self.message_log.dirty
+
+    @timing.timed("Engine.handle_enemy_turns")
     def handle_enemy_turns(self) -> None:
-        for entity in set(self.game_map.actors) - {self.player}:
-            if entity.ai:
-                try:
-                    entity.ai.perform()
-                except exceptions.Impossible:
-                    pass  # Ignore impossible action exceptions from AI.
+        try:
+            self.game_map.wake_actors(self.player.x, self.player.y, WAKE_RADIUS, in_view=True)
+            for entity in self.game_map.scheduler.take_turn():
+                if entity.ai:
+                    try:
+                        entity.ai.perform()
+                    except exceptions.Impossible:
+                        pass  # Ignore impossible action exceptions from AI.
+        finally:
+            self._player_pathfinder = None  # The distance field is only valid for this turn.
+            self.turn_count += 1
+            self.dirty = True
+
+    def get_player_pathfinder(self) -> tcod.path.Pathfinder:
+        """Return a pathfinder rooted at the player, shared by all enemies during this turn.
 
+        The distance field is only resolved as far as enemies ask for it, so its cost is at most one pass over the
+        map per turn no matter how many enemies are chasing the player.
+        """
+        if self._player_pathfinder is None:
+            graph = tcod.path.SimpleGraph(cost=self.game_map.get_path_cost(), cardinal=2, diagonal=3)
+            self._player_pathfinder = tcod.path.Pathfinder(graph)
+            self._player_pathfinder.add_root((self.player.x, self.player.y))
+        return self._player_pathfinder
+
+    @timing.timed("Engine.update_fov")
     def update_fov(self) -> None:
         """Recompute the visible area based on the players point of view."""
-        self.game_map.visible[:] = compute_fov(
-            self.game_map.tiles["transparent"],
-            (self.player.x, self.player.y),
-            radius=8,
-        )
-        # If a tile is "visible" it should be added to "explored".
-        self.game_map.explored |= self.game_map.visible
+        self.game_map.update_fov(self.player.x, self.player.y, radius=8)
 
+    @timing.timed("Engine.render")
     def render(self, console: Console) -> None:
+        self.dirty = False
         self.game_map.render(console)
 
         self.message_log.render(console=console, x=21, y=45, width=40, height=5)
@@ -63,8 +100,8 @@ def render(self, console: Console) -> None:
 
         render_functions.render_names_at_mouse_location(console=console, x=21, y=44, engine=self)
 
-    def save_as(self, filename: str) -> None:
-        """Save this Engine instance as a compressed file."""
-        save_data = lzma.compress(pickle.dumps(self))
-        with open(filename, "wb") as f:
-            f.write(save_data)
+    def save_as(self, filename: str, codec: Optional[str] = None) -> None:
+        """Save this game to a file, compressed with `codec` or the default codec of `savefile`."""
+        import savefile
+
+        savefile.save(self, filename, codec or savefile.DEFAULT_CODEC)
@@ -1,10 +1,11 @@
 from __future__ import annotations
 
 from typing import TYPE_CHECKING, Optional, Tuple, Type, TypeVar, Union
-import copy
 import math
 
 from render_order import RenderOrder
+from scheduler import NORMAL_SPEED
+from slots import shallow_copy
 
 if TYPE_CHECKING:
     from components.ai import BaseAI
@@ -24,6 +25,8 @@ class Entity:
     A generic object to represent players, enemies, items, etc.
     """
 
+    __slots__ = ("parent", "x", "y", "char", "color", "name", "_blocks_movement", "_render_order", "prototype_id")
+
     parent: Union[GameMap, Inventory]
 
     def __init__(
@@ -44,34 +47,89 @@ def __init__(
         self.name = name
         self.blocks_movement = blocks_movement
         self.render_order = render_order
+        self.prototype_id: Optional[str] = None  # The entity_factories template this is a copy of, if any.
         if parent:
             # If parent isn't provided now then it will be set later.
             self.parent = parent
-            parent.entities.add(self)
+            parent.add_entity(self)
 
     @property
     def gamemap(self) -> GameMap:
         return self.parent.gamemap
 
+    @property
+    def placed_gamemap(self) -> Optional[GameMap]:
+        """Return the GameMap this entity is placed on, or None if it is held in an inventory or not placed yet."""
+        if hasattr(self, "parent") and self.parent is self.gamemap:
+            return self.gamemap
+        return None
+
+    @property
+    def blocks_movement(self) -> bool:
+        return self._blocks_movement
+
+    @blocks_movement.setter
+    def blocks_movement(self, value: bool) -> None:
+        changed = value != getattr(self, "_blocks_movement", value)
+        self._blocks_movement = value
+        gamemap = self.placed_gamemap
+        if changed and gamemap:
+            gamemap.add_crowd_cost(self.x, self.y, 1 if value else -1)
+        self.update_table_row()
+
+    @property
+    def render_order(self) -> RenderOrder:
+        return self._render_order
+
+    @render_order.setter
+    def render_order(self, value: RenderOrder) -> None:
+        previous = getattr(self, "_render_order", value)
+        self._render_order = value
+        gamemap = self.placed_gamemap
+        if previous is not value and gamemap:
+            gamemap.change_render_order(self, previous)
+
+    def update_table_row(self) -> None:
+        """Copy the state of this entity into the actor table of its map, if it has a row there."""
+
+    def copy(self: T) -> T:
+        """Return an unplaced copy of this entity, such as a template from entity_factories.
+
+        Immutable data such as the name, char and color is shared with this entity, only per-instance state like
+        components is copied.  This is much faster than `copy.deepcopy`.
+        """
+        clone = shallow_copy(self)
+        if hasattr(clone, "parent"):
+            del clone.parent
+        clone._copy_components()
+        return clone
+
+    def _copy_components(self) -> None:
+        """Replace the components shared with the entity this was shallow copied from with copies of its own."""
+
     def spawn(self: T, gamemap: GameMap, x: int, y: int) -> T:
         """Spawn a copy of this instance at the given location."""
-        clone = copy.deepcopy(self)
+        clone = self.copy()
         clone.x = x
         clone.y = y
         clone.parent = gamemap
-        gamemap.entities.add(clone)
+        gamemap.add_entity(clone)
         return clone
 
     def place(self, x: int, y: int, gamemap: Optional[GameMap] = None) -> None:
         """Place this entitiy at a new location.  Handles moving across GameMaps."""
-        self.x = x
-        self.y = y
         if gamemap:
-            if hasattr(self, "parent"):  # Possibly uninitialized.
-                if self.parent is self.gamemap:
-                    self.gamemap.entities.remove(self)
+            if self.placed_gamemap:
+                self.gamemap.remove_entity(self)
+            self.x = x
+            self.y = y
             self.parent = gamemap
-            gamemap.entities.add(self)
+            gamemap.add_entity(self)
+        elif self.placed_gamemap:
+            self.gamemap.move_entity(self, x, y)
+        else:
+            self.x = x
+            self.y = y
 
     def distance(self, x: int, y: int) -> float:
         """
@@ -81,11 +139,12 @@ def distance(self, x: int, y: int) -> float:
 
     def move(self, dx: int, dy: int) -> None:
         # Move the entity by a given amount
-        self.x += dx
-        self.y += dy
+        self.gamemap.move_entity(self, self.x + dx, self.y + dy)
 
 
 class Actor(Entity):
+    __slots__ = ("_ai", "equipment", "fighter", "inventory", "level", "speed", "table_handle")
+
     def __init__(
         self,
         *,
@@ -99,7 +158,9 @@ def __init__(
         fighter: Fighter,
         inventory: Inventory,
         level: Level,
+        speed: int = NORMAL_SPEED,
     ):
+        self.table_handle = -1  # This actor's row in the actor table of the map it is placed on, or -1.
         super().__init__(
             x=x,
             y=y,
@@ -110,7 +171,7 @@ def __init__(
             render_order=RenderOrder.ACTOR,
         )
 
-        self.ai: Optional[BaseAI] = ai_cls(self)
+        self.ai = ai_cls(self)
 
         self.equipment: Equipment = equipment
         self.equipment.parent = self
@@ -124,6 +185,29 @@ def __init__(
         self.level = level
         self.level.parent = self
 
+        self.speed = speed  # How often this actor acts, see `scheduler.act_delay`.
+
+    @property
+    def ai(self) -> Optional[BaseAI]:
+        return self._ai
+
+    @ai.setter
+    def ai(self, value: Optional[BaseAI]) -> None:
+        self._ai = value
+        self.update_table_row()  # The actor is only alive while it has an AI.
+
+    def update_table_row(self) -> None:
+        if self.table_handle >= 0:
+            self.gamemap.actor_table.update(self.table_handle, self)
+
+    def _copy_components(self) -> None:
+        self.table_handle = -1
+        self.ai = self.ai.copy_for(self) if self.ai else None
+        self.fighter = self.fighter.copy_for(self)
+        self.inventory = self.inventory.copy_for(self)
+        self.equipment = self.equipment.copy_for(self)  # After the inventory, which holds the equipped items.
+        self.level = self.level.copy_for(self)
+
     @property
     def is_alive(self) -> bool:
         """Returns True as long as this actor can perform actions."""
@@ -131,6 +215,8 @@ def is_alive(self) -> bool:
 
 
 class Item(Entity):
+    __slots__ = ("consumable", "equippable")
+
     def __init__(
         self,
         *,
@@ -161,3 +247,9 @@ def __init__(
 
         if self.equippable:
             self.equippable.parent = self
+
+    def _copy_components(self) -> None:
+        if self.consumable:
+            self.consumable = self.consumable.copy_for(self)
+        if self.equippable:
+            self.equippable = self.equippable.copy_for(self)
@@ -1,10 +1,12 @@
+from typing import Dict
+
 from components import consumable, equippable
 from components.ai import HostileEnemy
 from components.equipment import Equipment
 from components.fighter import Fighter
 from components.inventory import Inventory
 from components.level import Level
-from entity import Actor, Item
+from entity import Actor, Entity, Item
 
 player = Actor(
     char="@",
@@ -75,3 +77,20 @@
 )
 
 chain_mail = Item(char="[", color=(139, 69, 19), name="Chain Mail", equippable=equippable.ChainMail())
+
+# Every template by a stable id, so that save files can store entities as references to their template.
+prototypes: Dict[str, Entity] = {
+    "player": player,
+    "orc": orc,
+    "troll": troll,
+    "confusion_scroll": confusion_scroll,
+    "fireball_scroll": fireball_scroll,
+    "health_potion": health_potion,
+    "lightning_scroll": lightning_scroll,
+    "dagger": dagger,
+    "sword": sword,
+    "leather_armor": leather_armor,
+    "chain_mail": chain_mail,
+}
+for prototype_id, prototype in prototypes.items():
+    prototype.prototype_id = prototype_id
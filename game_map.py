@@ -1,29 +1,83 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Iterable, Iterator, Optional
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING, AbstractSet, Any, Dict, Iterable, Iterator, List, Optional, Tuple
+import random
 
 from tcod.console import Console
+from tcod.map import compute_fov
 import numpy as np
 
+from actor_table import ActorTable
 from entity import Actor, Item
+from path_cache import PathCache
+from render_bucket import RenderBucket
+from render_order import RenderOrder
+from scheduler import TurnScheduler
 import tile_types
+import timing
 
 if TYPE_CHECKING:
     from engine import Engine
     from entity import Entity
 
+# Extra pathfinding cost of a tile occupied by a blocking entity.
+CROWD_COST = 10
+
+# Dormant actors this close to the player, or in view of the player, wake up at the start of each enemy turn.
+WAKE_RADIUS = 10
+# Hostile enemies farther than this from the player, out of view and with nowhere to go, go dormant.
+SLEEP_DISTANCE = 12
+
+# The number of out of date regions of the map graphics after which the whole map is recomposited instead.
+MAX_STALE_REGIONS = 64
+
+# Generates upcoming floors in the background.
+_prefetch_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="floor-prefetch")
+
 
 class GameMap:
-    def __init__(self, engine: Engine, width: int, height: int, entities: Iterable[Entity] = ()):
+    def __init__(
+        self, engine: Engine, width: int, height: int, entities: Iterable[Entity] = (), *, seed: Optional[int] = None
+    ):
         self.engine = engine
         self.width, self.height = width, height
-        self.entities = set(entities)
+        self.seed = seed
+        self.rng = random.Random(seed)  # All randomness on this map, from generation onward, comes from this.
         self.tiles = np.full((width, height), fill_value=tile_types.wall, order="F")
+        self.tiles_version = 0  # Incremented every time the tiles are changed.
+        # Pathfinding costs kept up to date with tiles and blocking entities.  Borrowed by pathfinders as-is.
+        self.path_cost = np.array(self.tiles["walkable"], dtype=np.int8, order="F")
+        self.blockers = np.zeros((width, height), dtype=np.int8, order="F")  # The blocking entities on each tile.
+        self.path_cache = PathCache()  # Paths computed by the actors on this map.
+
+        # Entities are kept as ordered sets (dicts with None values) so that iterating over them, and so the order
+        # enemies take their turns in, is the same every time a game is played or replayed.
+        self.entities: Dict[Entity, None] = {}
+        # Entities indexed by their (x, y) location, kept in sync by add_entity, remove_entity and move_entity.
+        self._entities_by_location: Dict[Tuple[int, int], Dict[Entity, None]] = {}
+        # The actors on this map as parallel arrays, kept in sync with the actors.
+        self.actor_table = ActorTable()
+        # The entities on this map by render order, in the order they are drawn.
+        self.render_buckets = {render_order: RenderBucket() for render_order in RenderOrder}
+        # When the living actors on this map other than the player act.
+        self.scheduler = TurnScheduler()
+        for entity in entities:
+            self.add_entity(entity)
 
         self.visible = np.full((width, height), fill_value=False, order="F")  # Tiles the player can currently see
         self.explored = np.full((width, height), fill_value=False, order="F")  # Tiles the player has seen before
+        # The origin, radius and tiles version of the last FOV update, and the window it was computed over.
+        self._fov_key: Optional[Tuple[int, int, int, int]] = None
+        self._fov_window: Tuple[slice, slice] = (slice(0, 0), slice(0, 0))
+        # The composited map graphics, and the indexes of the parts of it which are out of date, or None if all of it is.
+        self._graphics = np.zeros((width, height), dtype=tile_types.graphic_dt, order="F")
+        self._stale_regions: Optional[List[Any]] = None
 
+        self.entrance_location = (0, 0)  # Where the player arrives on this map.
         self.downstairs_location = (0, 0)
+        # True if the tiles, FOV or entities changed since this map was last rendered.
+        self.dirty = True
 
     @property
     def gamemap(self) -> GameMap:
@@ -38,52 +92,263 @@ def actors(self) -> Iterator[Actor]:
     def items(self) -> Iterator[Item]:
         yield from (entity for entity in self.entities if isinstance(entity, Item))
 
+    def add_entity(self, entity: Entity) -> None:
+        """Add an entity to this map at its current location."""
+        self.entities[entity] = None
+        self._entities_by_location.setdefault((entity.x, entity.y), {})[entity] = None
+        self.render_buckets[entity.render_order].add(entity)
+        if entity.blocks_movement:
+            self.add_crowd_cost(entity.x, entity.y, 1)
+        if isinstance(entity, Actor):
+            entity.table_handle = self.actor_table.add(entity)
+            if entity.is_alive and entity is not self.engine.player:
+                self.scheduler.add(entity)
+        self.dirty = True
+
+    def remove_entity(self, entity: Entity) -> None:
+        """Remove an entity from this map."""
+        if entity not in self.entities:
+            return
+        del self.entities[entity]
+        self._unindex_entity(entity)
+        self.render_buckets[entity.render_order].discard(entity)
+        if entity.blocks_movement:
+            self.add_crowd_cost(entity.x, entity.y, -1)
+        if isinstance(entity, Actor):
+            self.actor_table.remove(entity.table_handle)
+            entity.table_handle = -1
+            self.scheduler.remove(entity)
+        self.dirty = True
+
+    def move_entity(self, entity: Entity, x: int, y: int) -> None:
+        """Move an entity on this map to a new location."""
+        self._unindex_entity(entity)
+        if entity.blocks_movement:
+            self.add_crowd_cost(entity.x, entity.y, -1)
+            self.add_crowd_cost(x, y, 1)
+        entity.x = x
+        entity.y = y
+        self._entities_by_location.setdefault((x, y), {})[entity] = None
+        self.render_buckets[entity.render_order].invalidate()
+        if isinstance(entity, Actor):
+            self.actor_table.x[entity.table_handle] = x
+            self.actor_table.y[entity.table_handle] = y
+        self.dirty = True
+
+    def change_render_order(self, entity: Entity, previous: RenderOrder) -> None:
+        """Move an entity on this map to the render bucket of its new render order."""
+        self.render_buckets[previous].discard(entity)
+        self.render_buckets[entity.render_order].add(entity)
+        self.dirty = True
+
+    def _unindex_entity(self, entity: Entity) -> None:
+        location = entity.x, entity.y
+        entities_here = self._entities_by_location.get(location)
+        if entities_here is None:
+            return
+        entities_here.pop(entity, None)
+        if not entities_here:
+            del self._entities_by_location[location]  # Keep the index limited to occupied tiles.
+
+    def get_entities_at_location(self, x: int, y: int) -> AbstractSet[Entity]:
+        """Return the entities at the given location.  The result must not be modified."""
+        entities_here = self._entities_by_location.get((x, y))
+        return entities_here.keys() if entities_here is not None else frozenset()
+
     def get_blocking_entity_at_location(
         self,
         location_x: int,
         location_y: int,
     ) -> Optional[Entity]:
-        for entity in self.entities:
-            if entity.blocks_movement and entity.x == location_x and entity.y == location_y:
+        for entity in self.get_entities_at_location(location_x, location_y):
+            if entity.blocks_movement:
                 return entity
 
         return None
 
     def get_actor_at_location(self, x: int, y: int) -> Optional[Actor]:
-        for actor in self.actors:
-            if actor.x == x and actor.y == y:
-                return actor
+        for entity in self.get_entities_at_location(x, y):
+            if isinstance(entity, Actor) and entity.is_alive:
+                return entity
 
         return None
 
+    def get_items_at_location(self, x: int, y: int) -> Iterator[Item]:
+        yield from (entity for entity in self.get_entities_at_location(x, y) if isinstance(entity, Item))
+
+    def _squared_distances(self, x: int, y: int) -> np.ndarray:
+        """Return the squared distance from `x`, `y` to each row of the actor table."""
+        table = self.actor_table
+        return (table.x - x) ** 2 + (table.y - y) ** 2
+
+    def get_actors_in_radius(self, x: int, y: int, radius: float) -> List[Actor]:
+        """Return the living actors within `radius` tiles of `x`, `y`, in the order of their table handles."""
+        table = self.actor_table
+        in_radius = table.alive & (self._squared_distances(x, y) <= radius**2)
+        actors = [table.actors[handle] for handle in np.flatnonzero(in_radius)]
+        return [actor for actor in actors if actor is not None]
+
+    def get_nearest_visible_actor(
+        self, x: int, y: int, max_distance: float, exclude: Optional[Actor] = None
+    ) -> Optional[Actor]:
+        """Return the living actor in the players view which is nearest to `x`, `y` and closer than `max_distance`.
+
+        `exclude` is never returned.  Ties go to the actor with the lowest table handle.
+        """
+        table = self.actor_table
+        distances = self._squared_distances(x, y)
+        candidates = table.alive & (distances < max_distance**2)
+        candidates &= self.visible[table.x, table.y]  # Unused rows still hold coordinates on this map.
+        if exclude is not None and exclude.table_handle >= 0 and table.actors[exclude.table_handle] is exclude:
+            candidates[exclude.table_handle] = False
+        handles = np.flatnonzero(candidates)
+        if not len(handles):
+            return None
+        return table.actors[handles[distances[handles].argmin()]]
+
+    def set_dormant(self, actor: Actor) -> None:
+        """Stop giving an actor on this map turns until it's woken by `wake_actors`."""
+        self.actor_table.dormant[actor.table_handle] = True
+        self.scheduler.remove(actor)
+
+    def is_dormant(self, actor: Actor) -> bool:
+        return actor.table_handle >= 0 and bool(self.actor_table.dormant[actor.table_handle])
+
+    def wake_actors(self, x: int, y: int, radius: float, *, in_view: bool = False) -> int:
+        """Wake the dormant actors within `radius` of `x`, `y`, and any in the players view if `in_view` is True.
+
+        Returns the number of actors woken.  Actors are woken in the order of their table handles.
+        """
+        table = self.actor_table
+        dormant = table.dormant & table.alive
+        if not dormant.any():
+            return 0
+        near = self._squared_distances(x, y) <= radius**2
+        if in_view:
+            near |= self.visible[table.x, table.y]
+        handles = np.flatnonzero(dormant & near)
+        for handle in handles:
+            actor = table.actors[handle]
+            assert actor is not None
+            table.dormant[handle] = False
+            self.scheduler.add(actor)
+        return len(handles)
+
+    def get_path_cost(self) -> np.ndarray:
+        """Return the pathfinding cost array for this map.
+
+        Walkable tiles cost 1 and walls cost 0 (blocked).  Tiles occupied by a blocking entity cost extra.
+
+        The array is updated in place as the map changes and must not be modified by the caller.
+        """
+        return self.path_cost
+
+    def add_crowd_cost(self, x: int, y: int, count: int) -> None:
+        """Add or remove (if `count` is negative) the cost of `count` blocking entities at this location."""
+        self.blockers[x, y] += count
+        # Walls stay at zero (blocking.)
+        if self.tiles["walkable"][x, y]:
+            # Add to the cost of a blocked position.
+            # A lower number means more enemies will crowd behind each other in
+            # hallways.  A higher number means enemies will take longer paths in
+            # order to surround the player.
+            self.path_cost[x, y] += CROWD_COST * count
+
+    def set_tiles(self, index: Any, tile: np.ndarray) -> None:
+        """Assign `tile` to `self.tiles[index]` and update the derived cost array to match."""
+        self.tiles[index] = tile
+        self.tiles_version += 1
+        self.mark_stale(index)
+        # Keep the crowd costs of the blocking entities standing on the changed tiles.
+        self.path_cost[index] = self.tiles["walkable"][index] * (1 + CROWD_COST * self.blockers[index])
+
+    def update_fov(self, x: int, y: int, radius: int) -> None:
+        """Recompute the visible area from the point of view at `x`, `y`.
+
+        Nothing is done if neither the origin nor the tiles changed since the last update.  Otherwise the FOV is only
+        computed over the window within `radius` of the origin, and only that window of `visible` and `explored` is
+        updated along with clearing the previous window.
+        """
+        fov_key = x, y, radius, self.tiles_version
+        if fov_key == self._fov_key:
+            return
+        self._fov_key = fov_key
+
+        if radius > 0:
+            window = (
+                slice(max(0, x - radius), min(self.width, x + radius + 1)),
+                slice(max(0, y - radius), min(self.height, y + radius + 1)),
+            )
+        else:  # A radius of zero is unlimited.
+            window = (slice(0, self.width), slice(0, self.height))
+
+        self.mark_stale(self._fov_window)
+        self.mark_stale(window)
+        self.visible[self._fov_window] = False
+        visible = compute_fov(
+            self.tiles["transparent"][window],
+            (x - window[0].start, y - window[1].start),
+            radius=radius,
+        )
+        self.visible[window] = visible
+        # If a tile is "visible" it should be added to "explored".
+        self.explored[window] |= visible
+        self._fov_window = window
+
     def in_bounds(self, x: int, y: int) -> bool:
         """Return True if x and y are inside of the bounds of this map."""
         return 0 <= x < self.width and 0 <= y < self.height
 
-    def render(self, console: Console) -> None:
+    def mark_stale(self, index: Any = None) -> None:
+        """Mark the graphics of the tiles at `index` as out of date, or all of them if `index` is None.
+
+        This must be called after `visible` or `explored` are changed other than by `update_fov`.
         """
-        Renders the map.
+        self.dirty = True
+        if index is None:
+            self._stale_regions = None
+        elif self._stale_regions is not None:
+            self._stale_regions.append(index)
+            if len(self._stale_regions) > MAX_STALE_REGIONS:
+                self._stale_regions = None  # Not rendered for a while, such as while playing headless.
+
+    def update_graphics(self) -> np.ndarray:
+        """Recomposite the out of date parts of the map graphics and return them.
 
         If a tile is in the "visible" array, then draw it with the "light" colors.
         If it isn't, but it's in the "explored" array, then draw it with the "dark" colors.
         Otherwise, the default is "SHROUD".
         """
-        console.rgb[0 : self.width, 0 : self.height] = np.select(
-            condlist=[self.visible, self.explored],
-            choicelist=[self.tiles["light"], self.tiles["dark"]],
-            default=tile_types.SHROUD,
-        )
+        stale_regions = self._stale_regions
+        if stale_regions is None:
+            stale_regions = [(slice(None), slice(None))]
+        for index in stale_regions:
+            self._graphics[index] = np.select(
+                condlist=[self.visible[index], self.explored[index]],
+                choicelist=[self.tiles["light"][index], self.tiles["dark"][index]],
+                default=tile_types.SHROUD,
+            )
+        self._stale_regions = []
+        return self._graphics
 
-        entities_sorted_for_rendering = sorted(self.entities, key=lambda x: x.render_order.value)
+    @timing.timed("GameMap.render")
+    def render(self, console: Console) -> None:
+        """Renders the map, only recompositing the tiles which changed since the last time it was rendered."""
+        rgb = console.rgb[0 : self.width, 0 : self.height]
+        rgb[...] = self.update_graphics()
+        self.dirty = False
 
-        for entity in entities_sorted_for_rendering:
-            if self.visible[entity.x, entity.y]:
-                console.print(x=entity.x, y=entity.y, string=entity.char, fg=entity.color)
+        for bucket in self.render_buckets.values():  # RenderOrder members are in drawing order.
+            bucket.draw(rgb, self.visible)
 
 
 class GameWorld:
     """
     Holds the settings for the GameMap, and generates new maps when moving down the stairs.
+
+    Each floor is generated from its own seed derived from the worlds `seed`, so a floor can always be regenerated.
+
+    If `prefetch` is True then the next floor is generated in a background thread while the current floor is played.
     """
 
     def __init__(
@@ -96,9 +361,15 @@ def __init__(
         room_min_size: int,
         room_max_size: int,
         current_floor: int = 0,
+        seed: Optional[int] = None,
+        prefetch: bool = True,
     ):
         self.engine = engine
 
+        if seed is None:
+            seed = random.getrandbits(64)
+        self.seed = seed
+
         self.map_width = map_width
         self.map_height = map_height
 
@@ -109,16 +380,65 @@ def __init__(
 
         self.current_floor = current_floor
 
-    def generate_floor(self) -> None:
-        from procgen import generate_dungeon
+        self.prefetch = prefetch
+        self._prefetched: Optional[Tuple[int, Future[GameMap]]] = None  # The floor number and its pending map.
 
+    def __getstate__(self) -> Dict[str, Any]:
+        """Drop the pending background floor, which can not be pickled."""
+        state = self.__dict__.copy()
+        state["_prefetched"] = None
+        return state
+
+    def generate_floor(self) -> None:
         self.current_floor += 1
 
-        self.engine.game_map = generate_dungeon(
+        dungeon = self._take_prefetched_floor(self.current_floor)
+        if dungeon is None:
+            dungeon = self._generate_dungeon(self.current_floor)
+
+        self.engine.game_map = dungeon
+        self.engine.player.place(*dungeon.entrance_location, dungeon)
+
+        self.prefetch_next_floor()
+
+    def prefetch_next_floor(self) -> None:
+        """Start generating the floor after the current one in the background, if prefetching is enabled."""
+        if self.prefetch and self._prefetched is None:
+            self._prefetched = self.current_floor + 1, _prefetch_executor.submit(
+                self._generate_dungeon, self.current_floor + 1
+            )
+
+    def floor_seed(self, floor_number: int) -> int:
+        """Return the seed used to generate the given floor."""
+        return random.Random(f"{self.seed}:{floor_number}").getrandbits(64)
+
+    def _generate_dungeon(self, floor_number: int) -> GameMap:
+        from procgen import generate_dungeon
+
+        return generate_dungeon(
             max_rooms=self.max_rooms,
             room_min_size=self.room_min_size,
             room_max_size=self.room_max_size,
             map_width=self.map_width,
             map_height=self.map_height,
             engine=self.engine,
+            floor_number=floor_number,
+            seed=self.floor_seed(floor_number),
         )
+
+    def _take_prefetched_floor(self, floor_number: int) -> Optional[GameMap]:
+        """Return the map generated in the background for this floor, or None if another floor was prefetched.
+
+        A prefetch which is still running is waited on, finishing it is never slower than starting over.
+        Returns None if the prefetch failed.
+        """
+        if self._prefetched is None:
+            return None
+        prefetched_floor, future = self._prefetched
+        self._prefetched = None
+        if prefetched_floor != floor_number:
+            future.cancel()
+            return None
+        if future.exception() is not None:
+            return None  # Generate the floor again, raising the error in this thread if it happens again.
+        return future.result()
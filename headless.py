@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""Run game sessions without a window, driven by a scripted player policy.
+
+This is used to measure simulation throughput on machines without a display::
+
+    python headless.py --turns 5000 --seed 1
+
+It can also replay the journal of a real session as fast as possible, to reproduce its performance::
+
+    python headless.py --replay savegame.journal
+"""
+from __future__ import annotations
+
+from functools import partial
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+import argparse
+import contextlib
+import time
+
+import tcod
+
+from actions import Action, BumpAction, ItemAction, PickupAction, TakeStairsAction, WaitAction
+from components.consumable import HealingConsumable
+from engine import Engine
+import exceptions
+import journal
+import setup_game
+
+Policy = Callable[[Engine], Action]
+"""A scripted player, which returns the next action for the player of the given engine."""
+
+
+class StairDiver:
+    """A simple player policy which fights its way to the stairs on each floor.
+
+    It attacks adjacent enemies, drinks potions when hurt, picks up items it walks over,
+    and otherwise follows a path to the down stairs.
+    """
+
+    def __init__(self) -> None:
+        self.path: List[Tuple[int, int]] = []
+
+    def __call__(self, engine: Engine) -> Action:
+        player = engine.player
+        game_map = engine.game_map
+
+        if player.fighter.hp < player.fighter.max_hp // 3:
+            for item in player.inventory.items:
+                if isinstance(item.consumable, HealingConsumable):
+                    return ItemAction(player, item)
+
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                if (dx or dy) and game_map.get_actor_at_location(player.x + dx, player.y + dy):
+                    return BumpAction(player, dx, dy)
+
+        if (player.x, player.y) == game_map.downstairs_location:
+            self.path = []
+            return TakeStairsAction(player)
+
+        if any(True for _ in game_map.get_items_at_location(player.x, player.y)):
+            if len(player.inventory.items) < player.inventory.capacity:
+                return PickupAction(player)
+
+        if not self.path or self.path[-1] != game_map.downstairs_location:
+            self.path = self.get_path_to_stairs(engine)
+        if not self.path:
+            return WaitAction(player)
+
+        dest_x, dest_y = self.path.pop(0)
+        if max(abs(dest_x - player.x), abs(dest_y - player.y)) != 1:
+            # The player was moved off of the path, find a new one next turn.
+            self.path = []
+            return WaitAction(player)
+        return BumpAction(player, dest_x - player.x, dest_y - player.y)
+
+    @staticmethod
+    def get_path_to_stairs(engine: Engine) -> List[Tuple[int, int]]:
+        graph = tcod.path.SimpleGraph(cost=engine.game_map.get_path_cost(), cardinal=2, diagonal=3)
+        pathfinder = tcod.path.Pathfinder(graph)
+        pathfinder.add_root((engine.player.x, engine.player.y))
+        path: List[List[int]] = pathfinder.path_to(engine.game_map.downstairs_location)[1:].tolist()
+        return [(index[0], index[1]) for index in path]
+
+
+class HeadlessStats:
+    """Turn counts and accumulated time spent in each measured phase."""
+
+    def __init__(self) -> None:
+        self.turns = 0
+        self.impossible_actions = 0
+        self.games = 0
+        self.deepest_floor = 0
+        self.elapsed = 0.0
+        self.phase_times: Dict[str, float] = {}
+        self.phase_counts: Dict[str, int] = {}
+
+    @contextlib.contextmanager
+    def measure(self, phase: str) -> Iterator[None]:
+        """Add the time spent inside this context to `phase`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phase_times[phase] = self.phase_times.get(phase, 0.0) + time.perf_counter() - start
+            self.phase_counts[phase] = self.phase_counts.get(phase, 0) + 1
+
+    @property
+    def turns_per_second(self) -> float:
+        return self.turns / self.elapsed if self.elapsed else 0.0
+
+    def report(self) -> str:
+        """Return a human readable summary of these stats."""
+        lines = [
+            f"Turns: {self.turns} in {self.elapsed:.3f}s ({self.turns_per_second:.1f} turns/sec)",
+            f"Games: {self.games}, deepest floor: {self.deepest_floor}, impossible actions: {self.impossible_actions}",
+        ]
+        for phase, total in self.phase_times.items():
+            count = self.phase_counts[phase]
+            lines.append(f"{phase}: {total:.3f}s total, {count} calls, {total / count * 1000:.3f}ms/call")
+        return "\n".join(lines)
+
+
+def step(engine: Engine, action: Action, stats: HeadlessStats) -> bool:
+    """Perform a player action and, if it was valid, the rest of the turn.
+
+    This mirrors `EventHandler.handle_action`.  Returns True if the action advanced a turn.
+    """
+    try:
+        if isinstance(action, TakeStairsAction):
+            with stats.measure("generate_floor"):
+                action.perform()
+        else:
+            action.perform()
+    except exceptions.Impossible:
+        stats.impossible_actions += 1
+        return False
+
+    with stats.measure("handle_enemy_turns"):
+        engine.handle_enemy_turns()
+
+    with stats.measure("update_fov"):
+        engine.update_fov()
+    return True
+
+
+def run(
+    turns: int,
+    seed: Optional[int] = None,
+    policy_factory: Callable[[], Policy] = StairDiver,
+    *,
+    prefetch_floors: bool = False,
+) -> HeadlessStats:
+    """Play `turns` turns with a fresh policy per game, starting a new game whenever the player dies.
+
+    If `seed` is given then game number N is started with the seed `seed + N`.
+    Floors are generated when they're reached unless `prefetch_floors` is True, so that generate_floor measures the
+    full generation time and no background work is hidden in the throughput.
+    """
+    stats = HeadlessStats()
+    engine: Optional[Engine] = None
+    policy = policy_factory()
+
+    start = time.perf_counter()
+    while stats.turns < turns:
+        if engine is None or not engine.player.is_alive:
+            with stats.measure("new_game"):
+                engine = setup_game.new_game(
+                    seed=None if seed is None else seed + stats.games, prefetch_floors=prefetch_floors
+                )
+            policy = policy_factory()
+            stats.games += 1
+
+        if step(engine, policy(engine), stats):
+            stats.turns += 1
+        stats.deepest_floor = max(stats.deepest_floor, engine.game_world.current_floor)
+    stats.elapsed = time.perf_counter() - start
+    return stats
+
+
+def replay(filename: str, *, prefetch_floors: bool = False) -> HeadlessStats:
+    """Replay a journal onto a new game with the journal's seed and settings."""
+    header, records = journal.read(filename)
+    if header.start_turn:
+        raise journal.ReplayError(f"{filename} was started from a saved game and can not be replayed on its own.")
+    stats = HeadlessStats()
+
+    start = time.perf_counter()
+    with stats.measure("new_game"):
+        engine = setup_game.new_game_from_journal(header, prefetch_floors=prefetch_floors)
+    stats.games = 1
+    stats.turns = journal.replay(engine, records, partial(step, stats=stats))
+    stats.deepest_floor = engine.game_world.current_floor
+    stats.elapsed = time.perf_counter() - start
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure game simulation throughput without a window.")
+    parser.add_argument("--turns", type=int, default=2000, help="number of turns to simulate")
+    parser.add_argument("--seed", type=int, default=None, help="random seed, for repeatable runs")
+    parser.add_argument("--replay", metavar="JOURNAL", help="replay this journal instead of a scripted player")
+    parser.add_argument(
+        "--prefetch", action="store_true", help="generate the next floor in the background, as the game does"
+    )
+    args = parser.parse_args()
+
+    if args.replay:
+        print(replay(args.replay, prefetch_floors=args.prefetch).report())
+    else:
+        print(run(args.turns, args.seed, prefetch_floors=args.prefetch).report())
+
+
+if __name__ == "__main__":
+    main()
@@ -6,9 +6,12 @@
 import tcod
 
 from actions import Action, BumpAction, PickupAction, WaitAction
+from offscreen import BackgroundSnapshot, console_pool
 import actions
 import color
 import exceptions
+import journal
+import timing
 
 if TYPE_CHECKING:
     from engine import Engine
@@ -66,6 +69,8 @@
 
 
 class BaseEventHandler(tcod.event.EventDispatch[ActionOrHandler]):
+    dirty = True  # Set on instances when their own state changes, and cleared by `mark_clean`.
+
     def handle_events(self, event: tcod.event.Event) -> BaseEventHandler:
         """Handle an event and return the next active event handler."""
         state = self.dispatch(event)
@@ -77,6 +82,14 @@ def handle_events(self, event: tcod.event.Event) -> BaseEventHandler:
     def on_render(self, console: tcod.Console) -> None:
         raise NotImplementedError()
 
+    def is_dirty(self) -> bool:
+        """Return True if `on_render` would draw something different than it did last time."""
+        return self.dirty
+
+    def mark_clean(self) -> None:
+        """Called after this handler was rendered."""
+        self.dirty = False
+
     def ev_quit(self, event: tcod.event.Quit) -> Optional[Action]:
         raise SystemExit()
 
@@ -87,12 +100,11 @@ class PopupMessage(BaseEventHandler):
     def __init__(self, parent_handler: BaseEventHandler, text: str):
         self.parent = parent_handler
         self.text = text
+        self.background = BackgroundSnapshot(dim=True)
 
     def on_render(self, console: tcod.Console) -> None:
         """Render the parent and dim the result, then print the message on top."""
-        self.parent.on_render(console)
-        console.tiles_rgb["fg"] //= 8
-        console.tiles_rgb["bg"] //= 8
+        self.background.render(console, self.parent.on_render, stale=self.parent.is_dirty())
 
         console.print(
             console.width // 2,
@@ -107,6 +119,13 @@ def ev_keydown(self, event: tcod.event.KeyDown) -> Optional[BaseEventHandler]:
         """Any key returns to the parent handler."""
         return self.parent
 
+    def is_dirty(self) -> bool:
+        return self.dirty or self.parent.is_dirty()
+
+    def mark_clean(self) -> None:
+        self.dirty = False
+        self.parent.mark_clean()
+
 
 class EventHandler(BaseEventHandler):
     def __init__(self, engine: Engine):
@@ -127,6 +146,7 @@ def handle_events(self, event: tcod.event.Event) -> BaseEventHandler:
             return MainGameEventHandler(self.engine)  # Return to the main handler.
         return self
 
+    @timing.timed("EventHandler.handle_action")
     def handle_action(self, action: Optional[Action]) -> bool:
         """Handle actions returned from event methods.
 
@@ -135,11 +155,16 @@ def handle_action(self, action: Optional[Action]) -> bool:
         if action is None:
             return False
 
+        # Record the action before performing it, while any item it uses is still in the inventory.
+        record = journal.encode_action(self.engine, action) if self.engine.journal else None
         try:
-            action.perform()
+            with timing.measure("Action.perform"):
+                action.perform()
         except exceptions.Impossible as exc:
             self.engine.message_log.add_message(exc.args[0], color.impossible)
             return False  # Skip enemy turn on exceptions.
+        if self.engine.journal and record is not None:
+            self.engine.journal.write(record)
 
         self.engine.handle_enemy_turns()
 
@@ -153,6 +178,9 @@ def ev_mousemotion(self, event: tcod.event.MouseMotion) -> None:
     def on_render(self, console: tcod.Console) -> None:
         self.engine.render(console)
 
+    def is_dirty(self) -> bool:
+        return self.dirty or self.engine.is_dirty()
+
 
 class AskUserEventHandler(EventHandler):
     """Handles user input for actions which require special input."""
@@ -185,7 +213,24 @@ def on_exit(self) -> Optional[ActionOrHandler]:
         return MainGameEventHandler(self.engine)
 
 
-class CharacterScreenEventHandler(AskUserEventHandler):
+class MenuEventHandler(AskUserEventHandler):
+    """Draws a menu over a snapshot of the game, which is only re-rendered if the map or the message log change."""
+
+    def __init__(self, engine: Engine):
+        super().__init__(engine)
+        self.background = BackgroundSnapshot()
+
+    def is_background_stale(self) -> bool:
+        return self.engine.game_map.dirty or self.engine.message_log.dirty
+
+    def is_dirty(self) -> bool:
+        return self.dirty or self.is_background_stale()
+
+    def on_render(self, console: tcod.Console) -> None:
+        self.background.render(console, super().on_render, stale=self.is_background_stale())
+
+
+class CharacterScreenEventHandler(MenuEventHandler):
     TITLE = "Character Information"
 
     def on_render(self, console: tcod.Console) -> None:
@@ -223,7 +268,7 @@ def on_render(self, console: tcod.Console) -> None:
         console.print(x=x + 1, y=y + 5, string=f"Defense: {self.engine.player.fighter.defense}")
 
 
-class LevelUpEventHandler(AskUserEventHandler):
+class LevelUpEventHandler(MenuEventHandler):
     TITLE = "Level Up"
 
     def on_render(self, console: tcod.Console) -> None:
@@ -270,12 +315,9 @@ def ev_keydown(self, event: tcod.event.KeyDown) -> Optional[ActionOrHandler]:
         index = key - tcod.event.K_a
 
         if 0 <= index <= 2:
-            if index == 0:
-                player.level.increase_max_hp()
-            elif index == 1:
-                player.level.increase_power()
-            else:
-                player.level.increase_defense()
+            if self.engine.journal:
+                self.engine.journal.record_level_up(self.engine, index)
+            journal.level_up(player, index)
         else:
             self.engine.message_log.add_message("Invalid entry.", color.invalid)
 
@@ -290,7 +332,7 @@ def ev_mousebuttondown(self, event: tcod.event.MouseButtonDown) -> Optional[Acti
         return None
 
 
-class InventoryEventHandler(AskUserEventHandler):
+class InventoryEventHandler(MenuEventHandler):
     """This handler lets the user select an item.
 
     What happens then depends on the subclass.
@@ -532,6 +574,13 @@ def ev_keydown(self, event: tcod.event.KeyDown) -> Optional[ActionOrHandler]:
         elif key == tcod.event.K_SLASH:
             return LookHandler(self.engine)
 
+        elif key == tcod.event.K_F3:
+            timing.toggle()
+            self.dirty = True  # Show or hide the timing overlay.
+        elif key == tcod.event.K_F4:
+            timing.export_csv("timings.csv")
+            self.engine.message_log.add_message("Timings exported to timings.csv.")
+
         # No valid key was pressed
         return action
 
@@ -541,6 +590,10 @@ def on_quit(self) -> None:
         """Handle exiting out of a finished game."""
         if os.path.exists("savegame.sav"):
             os.remove("savegame.sav")  # Deletes the active save file.
+        if self.engine.journal:
+            self.engine.journal.close()  # Open files can not be removed on Windows.
+            self.engine.journal = None
+        journal.remove("savegame.journal")
         raise exceptions.QuitWithoutSaving()  # Avoid saving a finished game.
 
     def ev_quit(self, event: tcod.event.Quit) -> None:
@@ -570,7 +623,7 @@ def __init__(self, engine: Engine):
     def on_render(self, console: tcod.Console) -> None:
         super().on_render(console)  # Draw the main state as the background.
 
-        log_console = tcod.Console(console.width - 6, console.height - 6)
+        log_console = console_pool.get(console.width - 6, console.height - 6)
 
         # Draw a frame with a custom banner title.
         log_console.draw_frame(0, 0, log_console.width, log_console.height)
@@ -583,7 +636,8 @@ def on_render(self, console: tcod.Console) -> None:
             1,
             log_console.width - 2,
             log_console.height - 2,
-            self.engine.message_log.messages[: self.cursor + 1],
+            self.engine.message_log.messages,
+            last=self.cursor,
         )
         log_console.blit(console, 3, 3)
 
@@ -606,4 +660,5 @@ def ev_keydown(self, event: tcod.event.KeyDown) -> Optional[MainGameEventHandler
             self.cursor = self.log_length - 1  # Move directly to the last message.
         else:  # Any other key moves back to the main game state.
             return MainGameEventHandler(self.engine)
+        self.dirty = True
         return None
@@ -0,0 +1,229 @@
+"""Record every action the player performs to an append-only journal, and replay journals.
+
+A journal starts with a header holding the world seed and map settings of its game, followed by fixed size records.
+Since all of a game's randomness comes from its seed, a game can be recovered to its last turn by loading its last
+save and replaying the records after it, and a journal started with a new game can be replayed from the beginning.
+"""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, BinaryIO, Callable, Iterable, List, NamedTuple, Optional, Tuple
+import os
+import struct
+
+from actions import (
+    Action,
+    BumpAction,
+    DropItem,
+    EquipAction,
+    ItemAction,
+    MeleeAction,
+    MovementAction,
+    PickupAction,
+    TakeStairsAction,
+    WaitAction,
+)
+import exceptions
+
+if TYPE_CHECKING:
+    from engine import Engine
+    from entity import Actor
+
+MAGIC = b"RLJRNL\r\n"
+VERSION = 1
+_HEADER = struct.Struct("<8sHQIHHHHH")  # Magic, version, then the fields of JournalHeader.
+_RECORD = struct.Struct("<IBbbBhh")  # The fields of Record.
+
+# Record kinds.
+WAIT = 0
+BUMP = 1
+MELEE = 2
+MOVEMENT = 3
+PICKUP = 4
+TAKE_STAIRS = 5
+ITEM = 6  # Use the item at inventory index `item`, targeting `x`, `y`.
+DROP = 7
+EQUIP = 8
+LEVEL_UP = 9  # Pick level up choice `item` while the player is at level `x`.
+
+_DIRECTION_ACTIONS = {BumpAction: BUMP, MeleeAction: MELEE, MovementAction: MOVEMENT}
+
+
+class ReplayError(Exception):
+    """Raised when a journal can not be replayed onto a game."""
+
+
+class JournalHeader(NamedTuple):
+    seed: int
+    start_turn: int  # The turn the journal was started on, 0 if it can be replayed from a new game.
+    map_width: int
+    map_height: int
+    max_rooms: int
+    room_min_size: int
+    room_max_size: int
+
+
+class Record(NamedTuple):
+    turn: int  # The turn this was performed on.
+    kind: int
+    dx: int = 0
+    dy: int = 0
+    item: int = 0
+    x: int = 0
+    y: int = 0
+
+
+def encode_action(engine: Engine, action: Action) -> Record:
+    """Return the record of a player action.  This must be called before the action is performed."""
+    turn = engine.turn_count
+    for action_type, kind in _DIRECTION_ACTIONS.items():
+        if type(action) is action_type:
+            assert isinstance(action, (BumpAction, MeleeAction, MovementAction))
+            return Record(turn, kind, action.dx, action.dy)
+    if isinstance(action, DropItem):
+        return Record(turn, DROP, item=action.entity.inventory.items.index(action.item))
+    if isinstance(action, ItemAction):
+        x, y = action.target_xy
+        return Record(turn, ITEM, item=action.entity.inventory.items.index(action.item), x=x, y=y)
+    if isinstance(action, EquipAction):
+        return Record(turn, EQUIP, item=action.entity.inventory.items.index(action.item))
+    if isinstance(action, PickupAction):
+        return Record(turn, PICKUP)
+    if isinstance(action, TakeStairsAction):
+        return Record(turn, TAKE_STAIRS)
+    if isinstance(action, WaitAction):
+        return Record(turn, WAIT)
+    raise TypeError(f"Can not record actions of type {type(action).__name__}.")
+
+
+def decode_action(engine: Engine, record: Record) -> Action:
+    """Return the player action stored in `record`."""
+    player = engine.player
+    if record.kind == WAIT:
+        return WaitAction(player)
+    if record.kind == BUMP:
+        return BumpAction(player, record.dx, record.dy)
+    if record.kind == MELEE:
+        return MeleeAction(player, record.dx, record.dy)
+    if record.kind == MOVEMENT:
+        return MovementAction(player, record.dx, record.dy)
+    if record.kind == PICKUP:
+        return PickupAction(player)
+    if record.kind == TAKE_STAIRS:
+        return TakeStairsAction(player)
+    if record.kind in (ITEM, DROP, EQUIP):
+        if record.item >= len(player.inventory.items):
+            raise ReplayError(f"Turn {record.turn} uses a missing inventory item.")
+        item = player.inventory.items[record.item]
+        if record.kind == ITEM:
+            return ItemAction(player, item, (record.x, record.y))
+        if record.kind == DROP:
+            return DropItem(player, item)
+        return EquipAction(player, item)
+    raise ReplayError(f"Unknown record kind {record.kind} on turn {record.turn}.")
+
+
+def level_up(player: Actor, choice: int) -> None:
+    """Apply a level up choice: 0 for health, 1 for power, or 2 for defense."""
+    (player.level.increase_max_hp, player.level.increase_power, player.level.increase_defense)[choice]()
+
+
+class Journal:
+    """Appends the actions performed in a game to a journal file, flushing each record as it is written."""
+
+    def __init__(self, filename: str, engine: Engine):
+        """Open `filename` for appending.  A new header is written if the file is empty."""
+        self.filename = filename
+        self.file: BinaryIO = open(filename, "ab")
+        if self.file.tell() == 0:
+            world = engine.game_world
+            header = JournalHeader(
+                seed=world.seed,
+                start_turn=engine.turn_count,
+                map_width=world.map_width,
+                map_height=world.map_height,
+                max_rooms=world.max_rooms,
+                room_min_size=world.room_min_size,
+                room_max_size=world.room_max_size,
+            )
+            self.file.write(_HEADER.pack(MAGIC, VERSION, *header))
+            self.file.flush()
+
+    def write(self, record: Record) -> None:
+        self.file.write(_RECORD.pack(*record))
+        self.file.flush()  # Keep the journal complete up to the last turn if the game crashes.
+
+    def record_level_up(self, engine: Engine, choice: int) -> None:
+        """Record a level up choice.  This must be called before the choice is applied."""
+        self.write(Record(engine.turn_count, LEVEL_UP, item=choice, x=engine.player.level.current_level))
+
+    def close(self) -> None:
+        self.file.close()
+
+
+def read(filename: str) -> Tuple[JournalHeader, List[Record]]:
+    """Return the header and records of a journal.
+
+    An incomplete record at the end of the file, from a crash during a write, is ignored.
+    """
+    with open(filename, "rb") as f:
+        data = f.read()
+    if len(data) < _HEADER.size:
+        raise ReplayError(f"{filename} is not a journal.")
+    magic, version, *fields = _HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ReplayError(f"{filename} is not a journal.")
+    if version > VERSION:
+        raise ReplayError(f"{filename} is from a newer version of the game (format {version}).")
+    body = memoryview(data)[_HEADER.size :]
+    body = body[: len(body) - len(body) % _RECORD.size]
+    return JournalHeader(*fields), [Record(*fields) for fields in _RECORD.iter_unpack(body)]
+
+
+def matches(header: JournalHeader, engine: Engine) -> bool:
+    """Return True if a journal with this header belongs to the game of `engine`."""
+    return header.seed == engine.game_world.seed and header.start_turn <= engine.turn_count
+
+
+def perform_turn(engine: Engine, action: Action) -> bool:
+    """Perform a player action and the rest of its turn, like `EventHandler.handle_action`.
+
+    Returns True if the action advanced a turn.
+    """
+    try:
+        action.perform()
+    except exceptions.Impossible:
+        return False
+    engine.handle_enemy_turns()
+    engine.update_fov()
+    return True
+
+
+def replay(
+    engine: Engine, records: Iterable[Record], perform: Callable[[Engine, Action], bool] = perform_turn
+) -> int:
+    """Replay the records from the current turn of `engine` onward and return the number of turns replayed.
+
+    Earlier records are skipped, so a journal can be replayed on top of a save made while it was being written.
+    `perform` is called to perform each action and the rest of its turn.
+    """
+    turns = 0
+    for record in records:
+        if record.kind == LEVEL_UP:
+            # Level ups happen between turns, so they are matched by the level they were chosen at instead.
+            if record.turn == engine.turn_count and record.x == engine.player.level.current_level:
+                level_up(engine.player, record.item)
+            continue
+        if record.turn < engine.turn_count:
+            continue
+        if record.turn > engine.turn_count:
+            raise ReplayError(f"The journal skips from turn {engine.turn_count} to turn {record.turn}.")
+        if not perform(engine, decode_action(engine, record)):
+            raise ReplayError(f"The action on turn {record.turn} could not be performed.")
+        turns += 1
+    return turns
+
+
+def remove(filename: str) -> None:
+    """Delete a journal file if it exists."""
+    if os.path.exists(filename):
+        os.remove(filename)
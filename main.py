@@ -1,12 +1,16 @@
 #!/usr/bin/env python3
+from typing import Optional
+import os
 import traceback
 
 import tcod
 
+from autosave import Autosaver
 import color
 import exceptions
 import input_handlers
 import setup_game
+import timing
 
 
 def save_game(handler: input_handlers.BaseEventHandler, filename: str) -> None:
@@ -16,6 +20,12 @@ def save_game(handler: input_handlers.BaseEventHandler, filename: str) -> None:
         print("Game saved.")
 
 
+def close_journal(handler: input_handlers.BaseEventHandler) -> None:
+    """If the current event handler has an active Engine then close its journal."""
+    if isinstance(handler, input_handlers.EventHandler) and handler.engine.journal:
+        handler.engine.journal.close()
+
+
 def main() -> None:
     screen_width = 80
     screen_height = 50
@@ -23,6 +33,7 @@ def main() -> None:
     tileset = tcod.tileset.load_tilesheet("data/dejavu10x10_gs_tc.png", 32, 8, tcod.tileset.CHARMAP_TCOD)
 
     handler: input_handlers.BaseEventHandler = setup_game.MainMenu()
+    autosaver = Autosaver("savegame.sav")
 
     with tcod.context.new(
         columns=screen_width,
@@ -32,29 +43,48 @@ def main() -> None:
         vsync=True,
     ) as context:
         root_console = tcod.Console(screen_width, screen_height, order="F")
+        rendered_handler: Optional[input_handlers.BaseEventHandler] = None  # The handler currently on screen.
         try:
             while True:
-                root_console.clear()
-                handler.on_render(console=root_console)
-                context.present(root_console)
+                # Only render when something visible changed, the loop runs for every event while idle.
+                if handler is not rendered_handler or handler.is_dirty():
+                    root_console.clear()
+                    handler.on_render(console=root_console)
+                    if timing.enabled:
+                        timing.render_overlay(root_console)
+                    with timing.measure("context.present"):
+                        context.present(root_console)
+                    handler.mark_clean()
+                    rendered_handler = handler
 
                 try:
                     for event in tcod.event.wait():
                         context.convert_event(event)
+                        if isinstance(event, tcod.event.WindowEvent):
+                            rendered_handler = None  # The window may need to be presented again.
                         handler = handler.handle_events(event)
                 except Exception:  # Handle exceptions in game.
                     traceback.print_exc()  # Print error to stderr.
                     # Then print the error to the message log.
                     if isinstance(handler, input_handlers.EventHandler):
                         handler.engine.message_log.add_message(traceback.format_exc(), color.error)
+
+                autosaver.poll(handler)
         except exceptions.QuitWithoutSaving:
+            autosaver.wait()
+            if os.path.exists("savegame.sav"):
+                os.remove("savegame.sav")  # An autosave may have finished after the save was deleted.
             raise
         except SystemExit:  # Save and quit.
+            autosaver.wait()
             save_game(handler, "savegame.sav")
             raise
         except BaseException:  # Save on any other unexpected exception.
+            autosaver.wait()
             save_game(handler, "savegame.sav")
             raise
+        finally:
+            close_journal(handler)
 
 
 if __name__ == "__main__":
@@ -1,9 +1,14 @@
-from typing import Iterable, List, Reversible, Tuple
+from typing import Deque, Dict, Iterable, List, Optional, Sequence, Tuple
+import collections
 import textwrap
 
 import tcod
 
 import color
+import timing
+
+# The default number of messages kept by a MessageLog.
+MAX_MESSAGES = 1000
 
 
 class Message:
@@ -11,6 +16,7 @@ def __init__(self, text: str, fg: Tuple[int, int, int]):
         self.plain_text = text
         self.fg = fg
         self.count = 1
+        self._wrapped: Dict[int, Tuple[int, List[str]]] = {}  # Wrapped lines by width, with the count they are for.
 
     @property
     def full_text(self) -> str:
@@ -19,10 +25,23 @@ def full_text(self) -> str:
             return f"{self.plain_text} (x{self.count})"
         return self.plain_text
 
+    def wrap(self, width: int) -> List[str]:
+        """Return the full text of this message wrapped to `width`.  The result must not be modified."""
+        cached = self._wrapped.get(width)
+        if cached is None or cached[0] != self.count:
+            cached = self._wrapped[width] = self.count, list(MessageLog.wrap(self.full_text, width))
+        return cached[1]
+
 
 class MessageLog:
-    def __init__(self) -> None:
-        self.messages: List[Message] = []
+    def __init__(self, max_messages: int = MAX_MESSAGES, spill_filename: Optional[str] = None) -> None:
+        """Keep the last `max_messages` messages.
+
+        If `spill_filename` is given then older messages are appended to that file as they are dropped.
+        """
+        self.messages: Deque[Message] = collections.deque(maxlen=max_messages)
+        self.spill_filename = spill_filename
+        self.dirty = True  # True if messages were added since this log was last rendered.
 
     def add_message(self, text: str, fg: Tuple[int, int, int] = color.white, *, stack: bool = True) -> None:
         """Add a message to this log.
@@ -35,14 +54,25 @@ def add_message(self, text: str, fg: Tuple[int, int, int] = color.white, *, stac
         if stack and self.messages and text == self.messages[-1].plain_text:
             self.messages[-1].count += 1
         else:
+            if self.spill_filename and len(self.messages) == self.messages.maxlen:
+                self.spill(self.messages[0])
             self.messages.append(Message(text, fg))
+        self.dirty = True
+
+    def spill(self, message: Message) -> None:
+        """Append a message which is about to be dropped to the spill file."""
+        assert self.spill_filename
+        with open(self.spill_filename, "a", encoding="utf-8") as f:
+            f.write(f"{message.full_text}\n")
 
+    @timing.timed("MessageLog.render")
     def render(self, console: tcod.Console, x: int, y: int, width: int, height: int) -> None:
         """Render this log over the given area.
 
         `x`, `y`, `width`, `height` is the rectangular region to render onto
         the `console`.
         """
+        self.dirty = False
         self.render_messages(console, x, y, width, height, self.messages)
 
     @staticmethod
@@ -57,17 +87,27 @@ def wrap(string: str, width: int) -> Iterable[str]:
 
     @classmethod
     def render_messages(
-        cls, console: tcod.Console, x: int, y: int, width: int, height: int, messages: Reversible[Message]
+        cls,
+        console: tcod.Console,
+        x: int,
+        y: int,
+        width: int,
+        height: int,
+        messages: Sequence[Message],
+        last: Optional[int] = None,
     ) -> None:
         """Render the messages provided.
 
-        The `messages` are rendered starting at the last message and working
-        backwards.
+        The `messages` are rendered starting at the message at index `last`, or the last message if that is None, and
+        working backwards.
         """
         y_offset = height - 1
+        if last is None:
+            last = len(messages) - 1
 
-        for message in reversed(messages):
-            for line in reversed(list(cls.wrap(message.full_text, width))):
+        for index in range(last, -1, -1):
+            message = messages[index]
+            for line in reversed(message.wrap(width)):
                 console.print(x=x, y=y + y_offset, string=line, fg=message.fg)
                 y_offset -= 1
                 if y_offset < 0:
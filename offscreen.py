@@ -0,0 +1,52 @@
+"""Reusable offscreen consoles and frame snapshots, so that overlays don't allocate or re-render every frame."""
+from __future__ import annotations
+
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+import tcod
+
+
+class ConsolePool:
+    """Hands out offscreen consoles by size, reusing the same console for every request of a size."""
+
+    def __init__(self) -> None:
+        self._consoles: Dict[Tuple[int, int], tcod.Console] = {}
+
+    def get(self, width: int, height: int) -> tcod.Console:
+        """Return a cleared console of this size.
+
+        The console is shared, so it must not be kept past the next call to `get` with the same size.
+        """
+        console = self._consoles.get((width, height))
+        if console is None:
+            console = self._consoles[width, height] = tcod.Console(width, height, order="F")
+        else:
+            console.clear()
+        return console
+
+
+# The pool used by the event handlers.
+console_pool = ConsolePool()
+
+
+class BackgroundSnapshot:
+    """A copy of a rendered background, optionally dimmed, which is reused until what it shows changes."""
+
+    def __init__(self, dim: bool = False):
+        self.dim = dim
+        self._tiles: Optional[np.ndarray] = None
+
+    def render(self, console: tcod.Console, render_background: Callable[[tcod.Console], None], stale: bool) -> None:
+        """Draw the background onto `console`.
+
+        `render_background` is only called if `stale` is True or nothing has been captured yet.
+        """
+        if stale or self._tiles is None or self._tiles.shape != console.rgb.shape:
+            render_background(console)
+            if self.dim:
+                console.rgb["fg"] //= 8
+                console.rgb["bg"] //= 8
+            self._tiles = console.rgb.copy()
+        else:
+            console.rgb[...] = self._tiles
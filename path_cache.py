@@ -0,0 +1,107 @@
+"""A least recently used cache of paths, shared by every actor on a map."""
+from __future__ import annotations
+
+from typing import Iterator, Optional, Tuple
+import collections
+
+import numpy as np
+
+Point = Tuple[int, int]
+Path = Tuple[Point, ...]
+"""The positions along a path, from its start to its goal."""
+
+# A path with no steps, shared by everything without one.
+EMPTY_PATH: Path = ()
+
+# The default number of paths kept by a PathCache.
+MAX_PATHS = 256
+
+
+class CachedPath:
+    """A path, and the pathfinding costs of its positions when it was found."""
+
+    __slots__ = ("path", "costs")
+
+    def __init__(self, path: Path, costs: bytes):
+        self.path = path
+        self.costs = costs
+
+    @classmethod
+    def found_with(cls, positions: np.ndarray, path_cost: np.ndarray) -> CachedPath:
+        """Return a path from a (length, 2) array of its positions, which was found with the costs in `path_cost`."""
+        path: Path = tuple(map(tuple, positions.tolist()))  # type: ignore[arg-type]
+        return cls(path, path_cost[positions[:, 0], positions[:, 1]].tobytes())
+
+    def is_walkable_from(self, index: int, path_cost: np.ndarray) -> bool:
+        """Return True if no position from `index` on is blocked or costs more than when this path was found."""
+        # Most paths which are no longer walkable are blocked near the actor, so checking stops at the first failure.
+        for i in range(index, len(self.path)):
+            cost = path_cost[self.path[i]]
+            if not cost or cost > self.costs[i]:
+                return False
+        return True
+
+
+class PathCache:
+    """Paths keyed by their start and goal, reused for as long as the rest of the path stays walkable.
+
+    Paths are only checked against the costs of their own positions, so a cached path can be longer than a new one
+    after other tiles open up.  A path which is found to be blocked is dropped.
+    """
+
+    def __init__(self, max_paths: int = MAX_PATHS):
+        self.max_paths = max_paths
+        self._paths: collections.OrderedDict[Tuple[Point, Point], CachedPath] = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._paths)
+
+    def __iter__(self) -> Iterator[CachedPath]:
+        """Iterate over the cached paths from the least to the most recently used."""
+        return iter(self._paths.values())
+
+    def get(self, start: Point, goal: Point, path_cost: np.ndarray) -> Optional[Path]:
+        """Return the cached path from `start` to `goal` if it's still walkable, otherwise None."""
+        cached = self._reuse((start, goal), 1, path_cost)
+        if cached is None:
+            self.misses += 1
+            return None
+        return cached.path
+
+    def follow(self, path: Path, index: int, path_cost: np.ndarray) -> bool:
+        """Return True if `path` is cached and still walkable from `index`, such as for an actor part way along it."""
+        return index < len(path) and self._reuse((path[0], path[-1]), index, path_cost, path) is not None
+
+    def _reuse(
+        self, key: Tuple[Point, Point], index: int, path_cost: np.ndarray, path: Optional[Path] = None
+    ) -> Optional[CachedPath]:
+        """Return the path cached for `key` if it's walkable from `index`, and is `path` if that's given."""
+        cached = self._paths.get(key)
+        if cached is not None and (path is None or cached.path == path):
+            if cached.is_walkable_from(index, path_cost):
+                self._paths.move_to_end(key)
+                self.hits += 1
+                return cached
+            del self._paths[key]
+        return None
+
+    def put(self, positions: np.ndarray, path_cost: np.ndarray) -> Path:
+        """Cache a path from a (length, 2) array of its positions, which was found with `path_cost`, and return it.
+
+        Paths with no steps are not cached, and EMPTY_PATH is returned for them.
+        """
+        if len(positions) < 2:
+            return EMPTY_PATH
+        cached = CachedPath.found_with(positions, path_cost)
+        self.add(cached)
+        return cached.path
+
+    def add(self, cached: CachedPath) -> None:
+        """Cache a path, evicting the least recently used path if the cache is full."""
+        key = cached.path[0], cached.path[-1]
+        self._paths[key] = cached
+        self._paths.move_to_end(key)
+        if len(self._paths) > self.max_paths:
+            self._paths.popitem(last=False)
@@ -1,8 +1,9 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Dict, Iterator, List, Tuple
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
 import random
 
+import numpy as np
 import tcod
 
 from entity_curves import (
@@ -25,7 +26,10 @@ def get_max_value_for_floor(max_value_curve: SimpleCurve, floor: int) -> int:
 
 
 def get_entities_at_random(
-    entity_weight_curves: Dict[Entity, SimpleCurve], number_of_entities: int, floor: int
+    entity_weight_curves: Dict[Entity, SimpleCurve],
+    number_of_entities: int,
+    floor: int,
+    rng: Optional[random.Random] = None,
 ) -> List[Entity]:
     entities = []
     chances = []
@@ -38,7 +42,9 @@ def get_entities_at_random(
 
     chosen_entities = []
 
-    chosen_entities = random.choices(entities, weights=chances, k=number_of_entities)
+    if rng is None:
+        rng = random.Random()
+    chosen_entities = rng.choices(entities, weights=chances, k=number_of_entities)
 
     return chosen_entities
 
@@ -62,6 +68,11 @@ def inner(self) -> Tuple[slice, slice]:
         """Return the inner area of this room as a 2D array index."""
         return slice(self.x1 + 1, self.x2), slice(self.y1 + 1, self.y2)
 
+    @property
+    def outer(self) -> Tuple[slice, slice]:
+        """Return the area of this room including its walls as a 2D array index."""
+        return slice(self.x1, self.x2 + 1), slice(self.y1, self.y2 + 1)
+
     def intersects(self, other: RectangularRoom) -> bool:
         """Return True if this room overlaps with another RectangularRoom."""
         return (
@@ -73,35 +84,37 @@ def intersects(self, other: RectangularRoom) -> bool:
 
 
 def place_entities(room: RectangularRoom, dungeon: GameMap, floor_number: int) -> None:
-    number_of_monsters = random.randint(
+    rng = dungeon.rng
+    number_of_monsters = rng.randint(
         0, get_max_value_for_floor(max_monsters_by_floor, floor_number)
     )
-    number_of_items = random.randint(
+    number_of_items = rng.randint(
         0, get_max_value_for_floor(max_items_by_floor, floor_number)
     )
 
     monsters: List[Entity] = get_entities_at_random(
-        enemy_chances, number_of_monsters, floor_number
+        enemy_chances, number_of_monsters, floor_number, rng
     )
     items: List[Entity] = get_entities_at_random(
-        item_curves_by_floor, number_of_items, floor_number
+        item_curves_by_floor, number_of_items, floor_number, rng
     )
 
     for entity in monsters + items:
-        x = random.randint(room.x1 + 1, room.x2 - 1)
-        y = random.randint(room.y1 + 1, room.y2 - 1)
+        x = rng.randint(room.x1 + 1, room.x2 - 1)
+        y = rng.randint(room.y1 + 1, room.y2 - 1)
 
-        if not any(entity.x == x and entity.y == y for entity in dungeon.entities):
+        if (x, y) != dungeon.entrance_location and not dungeon.get_entities_at_location(x, y):
             entity.spawn(dungeon, x, y)
 
 
-def tunnel_between(
-    start: Tuple[int, int], end: Tuple[int, int]
-) -> Iterator[Tuple[int, int]]:
-    """Return an L-shaped tunnel between these two points."""
+def tunnel_between(start: Tuple[int, int], end: Tuple[int, int], rng: random.Random) -> np.ndarray:
+    """Return an L-shaped tunnel between these two points.
+
+    The tunnel is returned as an array of (x, y) coordinates with shape (length, 2).
+    """
     x1, y1 = start
     x2, y2 = end
-    if random.random() < 0.5:  # 50% chance.
+    if rng.random() < 0.5:  # 50% chance.
         # Move horizontally, then vertically.
         corner_x, corner_y = x2, y1
     else:
@@ -109,10 +122,12 @@ def tunnel_between(
         corner_x, corner_y = x1, y2
 
     # Generate the coordinates for this tunnel.
-    for x, y in tcod.los.bresenham((x1, y1), (corner_x, corner_y)).tolist():
-        yield x, y
-    for x, y in tcod.los.bresenham((corner_x, corner_y), (x2, y2)).tolist():
-        yield x, y
+    return np.concatenate(
+        [
+            tcod.los.bresenham((x1, y1), (corner_x, corner_y)),
+            tcod.los.bresenham((corner_x, corner_y), (x2, y2)),
+        ]
+    )
 
 
 def generate_dungeon(
@@ -122,49 +137,63 @@ def generate_dungeon(
     map_width: int,
     map_height: int,
     engine: Engine,
+    floor_number: Optional[int] = None,
+    seed: Optional[int] = None,
 ) -> GameMap:
-    """Generate a new dungeon map."""
-    player = engine.player
-    dungeon = GameMap(engine, map_width, map_height, entities=[player])
+    """Generate a new dungeon map.
+
+    All randomness comes from the new maps `rng`, seeded with `seed`, so the same seed always generates the same map.
+
+    The player is not placed on the new map, it should be placed at the maps `entrance_location`.
+    This does not modify the `engine`, so maps can be generated in the background.
+    """
+    if floor_number is None:
+        floor_number = engine.game_world.current_floor
+    dungeon = GameMap(engine, map_width, map_height, seed=seed)
+    rng = dungeon.rng
 
     rooms: List[RectangularRoom] = []
+    # Marks the tiles covered by accepted rooms, including their walls, so overlaps can be checked in one step.
+    occupied = np.zeros((map_width, map_height), dtype=bool, order="F")
 
     center_of_last_room = (0, 0)
 
     for _ in range(max_rooms):
-        room_width = random.randint(room_min_size, room_max_size)
-        room_height = random.randint(room_min_size, room_max_size)
+        room_width = rng.randint(room_min_size, room_max_size)
+        room_height = rng.randint(room_min_size, room_max_size)
 
-        x = random.randint(0, dungeon.width - room_width - 1)
-        y = random.randint(0, dungeon.height - room_height - 1)
+        x = rng.randint(0, dungeon.width - room_width - 1)
+        y = rng.randint(0, dungeon.height - room_height - 1)
 
         # "RectangularRoom" class makes rectangles easier to work with
         new_room = RectangularRoom(x, y, room_width, room_height)
 
-        # Run through the other rooms and see if they intersect with this one.
-        if any(new_room.intersects(other_room) for other_room in rooms):
+        # Check if this room intersects with any of the other rooms.
+        if occupied[new_room.outer].any():
             continue  # This room intersects, so go to the next attempt.
         # If there are no intersections then the room is valid.
+        occupied[new_room.outer] = True
 
         # Dig out this rooms inner area.
-        dungeon.tiles[new_room.inner] = tile_types.floor
+        dungeon.set_tiles(new_room.inner, tile_types.floor)
 
         if len(rooms) == 0:
             # The first room, where the player starts.
-            player.place(*new_room.center, dungeon)
+            dungeon.entrance_location = new_room.center
         else:  # All rooms after the first.
             # Dig out a tunnel between this room and the previous one.
-            for x, y in tunnel_between(rooms[-1].center, new_room.center):
-                dungeon.tiles[x, y] = tile_types.floor
+            tunnel = tunnel_between(rooms[-1].center, new_room.center, rng)
+            dungeon.set_tiles((tunnel[:, 0], tunnel[:, 1]), tile_types.floor)
 
             center_of_last_room = new_room.center
 
-        place_entities(new_room, dungeon, engine.game_world.current_floor)
-
-        dungeon.tiles[center_of_last_room] = tile_types.down_stairs
-        dungeon.downstairs_location = center_of_last_room
+        place_entities(new_room, dungeon, floor_number)
 
         # Finally, append the new room to the list.
         rooms.append(new_room)
 
+    if rooms:
+        dungeon.set_tiles(center_of_last_room, tile_types.down_stairs)
+        dungeon.downstairs_location = center_of_last_room
+
     return dungeon
@@ -0,0 +1,57 @@
+"""Entities grouped by render order, with their graphics cached as arrays so that they can be drawn all at once."""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from entity import Entity
+
+
+class RenderBucket:
+    """The entities of one RenderOrder on a map.
+
+    The positions, characters and colors of the entities are collected into arrays the first time the bucket is drawn
+    and reused until `invalidate` is called, which GameMap does whenever an entity in this bucket is added, removed or
+    moved.  Changes to an entity's char or color are only picked up after that, such as by changing its render order.
+    """
+
+    def __init__(self) -> None:
+        self.entities: Dict[Entity, None] = {}  # An ordered set, later entities are drawn over earlier ones.
+        self._arrays: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]] = None  # x, y, ch and fg.
+
+    def add(self, entity: Entity) -> None:
+        self.entities[entity] = None
+        self._arrays = None
+
+    def discard(self, entity: Entity) -> None:
+        if entity in self.entities:
+            del self.entities[entity]
+            self._arrays = None
+
+    def invalidate(self) -> None:
+        """Rebuild the cached arrays the next time this bucket is drawn."""
+        self._arrays = None
+
+    def _get_arrays(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        if self._arrays is None:
+            entities = self.entities
+            count = len(entities)
+            self._arrays = (
+                np.fromiter((entity.x for entity in entities), dtype=np.intp, count=count),
+                np.fromiter((entity.y for entity in entities), dtype=np.intp, count=count),
+                np.fromiter((ord(entity.char) for entity in entities), dtype=np.int32, count=count),
+                np.array([entity.color for entity in entities], dtype=np.uint8).reshape(count, 3),
+            )
+        return self._arrays
+
+    def draw(self, rgb: np.ndarray, visible: np.ndarray) -> None:
+        """Draw the entities standing on `visible` tiles onto the `rgb` array of a console."""
+        if not self.entities:
+            return
+        x, y, ch, fg = self._get_arrays()
+        shown = visible[x, y]
+        x, y = x[shown], y[shown]
+        rgb["ch"][x, y] = ch[shown]
+        rgb["fg"][x, y] = fg[shown]
@@ -0,0 +1,432 @@
+"""Read and write saved games.
+
+A save file starts with a fixed preamble and a JSON header, followed by sections of data:
+
+* The map layers as raw NumPy buffers: tile ids into `tile_types.TILES_BY_ID` and the bit-packed explored layer.
+* The entities as a table with one row per entity, storing the id of its `entity_factories` template and only the
+  state which can differ from that template.
+* The message log and the state of the map's random number generator.
+* The paths in the map's path cache and the paths enemies are following, so that the enemies of a loaded game move
+  the same way as in the game which was saved.
+
+The sections are compressed with one of the `CODECS`.  Uncompressed NumPy sections can be memory-mapped by `load`.
+
+Some state is simplified when saving: nested confusion is stored as a single confusion over the template's AI.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, BinaryIO, Callable, Dict, List, Optional, Tuple, Union
+import bz2
+import json
+import lzma
+import os
+import struct
+import tempfile
+import zlib
+
+import numpy as np
+
+from components.ai import ConfusedEnemy, HostileEnemy
+from engine import Engine
+from entity import Actor, Item
+from game_map import GameMap, GameWorld
+from message_log import Message
+from path_cache import EMPTY_PATH, CachedPath, Path
+import entity_factories
+import tile_types
+
+if TYPE_CHECKING:
+    from components.ai import BaseAI
+    from entity import Entity
+
+MAGIC = b"RLSAVE\r\n"
+VERSION = 1
+_PREAMBLE = struct.Struct("<8sHI")  # Magic, format version, header length.
+
+# Codec names and their (compress, decompress) functions.
+CODECS: Dict[str, Tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]] = {
+    "none": (lambda data: data, lambda data: data),
+    "zlib": (zlib.compress, zlib.decompress),
+    "lzma": (lzma.compress, lzma.decompress),
+    "bz2": (bz2.compress, bz2.decompress),
+}
+DEFAULT_CODEC = "zlib"
+
+# Kinds of AI stored in the entity table.
+AI_NONE = 0  # A corpse or an item.
+AI_PROTOTYPE = 1  # The AI created by the entity's template.
+AI_CONFUSED = 2  # Confused for `ai_turns` turns, then back to the template's AI.
+
+# One row per entity.  Items carried by an actor come after the rows of the entities on the map.
+entity_dt = np.dtype(
+    [
+        ("prototype", np.uint16),  # Index into the header's prototype ids.
+        ("x", np.int16),
+        ("y", np.int16),
+        ("holder", np.int32),  # Row of the actor carrying this item, or -1 if this entity is on the map.
+        ("equipped", bool),  # True if the holder has this item equipped.
+        ("hp", np.int32),
+        ("max_hp", np.int32),
+        ("base_defense", np.int32),
+        ("base_power", np.int32),
+        ("level", np.int32),
+        ("xp", np.int32),
+        ("ai", np.uint8),
+        ("ai_turns", np.int32),
+        ("delay", np.int32),  # How long after the start of the current turn this actor acts next.
+        ("schedule", np.int32),  # The position of this actor in the turn order, or -1 if it isn't scheduled.
+        ("path", np.int32),  # Row of the path this enemy is following, or -1.
+        ("path_index", np.int32),  # Index of the next position on that path.
+    ]
+)
+
+# One row per path, the positions of each path follow those of the previous path in the path steps section.
+path_dt = np.dtype(
+    [
+        ("length", np.int32),  # The number of positions, including the start.
+        ("cached", bool),  # True if the path is in the path cache.  Cached paths are stored least recently used first.
+    ]
+)
+path_step_dt = np.dtype(
+    [
+        ("x", np.int16),
+        ("y", np.int16),
+        ("cost", np.int8),  # The pathfinding cost of the position when the path was found, or 0 if not cached.
+    ]
+)
+
+Section = Union[np.ndarray, List[Any]]
+"""A NumPy array, or JSON compatible data."""
+
+
+class Snapshot:
+    """A copy of a game's state which can be written later, or from another thread.
+
+    Taking a snapshot only copies arrays and small values, the slower encoding happens in `write`.
+    """
+
+    def __init__(self, header: Dict[str, Any], sections: Dict[str, Section]):
+        self.header = header
+        self.sections = sections
+
+
+def _ai_state(ai: Optional[BaseAI]) -> Tuple[int, int]:
+    """Return the AI kind and turn count to store for `ai`."""
+    if ai is None:
+        return AI_NONE, 0
+    if isinstance(ai, ConfusedEnemy):
+        return AI_CONFUSED, ai.turns_remaining
+    return AI_PROTOTYPE, 0
+
+
+def _hostile_ai(ai: Optional[BaseAI]) -> Optional[HostileEnemy]:
+    """Return the HostileEnemy of `ai`, including the one a confused enemy will revert to, or None."""
+    if isinstance(ai, ConfusedEnemy):
+        ai = ai.previous_ai
+    return ai if isinstance(ai, HostileEnemy) else None
+
+
+def snapshot(engine: Engine) -> Snapshot:
+    """Return a snapshot of the current state of `engine`."""
+    game_map = engine.game_map
+    world = engine.game_world
+
+    # Compare tiles as raw bytes, which is much faster than comparing structured arrays field by field.
+    raw_dt = np.dtype((np.void, tile_types.tile_dt.itemsize))
+    raw_tiles = game_map.tiles.view(raw_dt)
+    tile_ids = np.zeros((game_map.width, game_map.height), dtype=np.uint8, order="F")
+    for tile_id, tile in enumerate(tile_types.TILES_BY_ID.view(raw_dt)):
+        tile_ids[raw_tiles == tile] = tile_id
+
+    schedule_ranks = game_map.scheduler.ranks()
+    prototype_ids: List[str] = []
+    prototype_index: Dict[str, int] = {}
+    rows: List[Tuple[Any, ...]] = []
+
+    path_rows: List[Tuple[Any, ...]] = []
+    path_steps: List[Tuple[Any, ...]] = []
+    path_row_of: Dict[Path, int] = {}  # Paths followed by several enemies are stored once.
+
+    def add_path(path: Path, costs: Optional[bytes]) -> int:
+        if path not in path_row_of:
+            path_row_of[path] = len(path_rows)
+            path_rows.append((len(path), costs is not None))
+            path_steps.extend((x, y, cost) for (x, y), cost in zip(path, costs or bytes(len(path))))
+        return path_row_of[path]
+
+    for cached in game_map.path_cache:
+        add_path(cached.path, cached.costs)
+
+    def add_row(entity: Entity, holder: int, equipped: bool) -> int:
+        if entity.prototype_id is None:
+            raise ValueError(f"{entity.name} has no prototype and can not be saved.")
+        if entity.prototype_id not in prototype_index:
+            prototype_index[entity.prototype_id] = len(prototype_ids)
+            prototype_ids.append(entity.prototype_id)
+        hp = max_hp = defense = power = level = xp = ai_turns = delay = path_position = 0
+        schedule = path = -1
+        ai = AI_NONE
+        if isinstance(entity, Actor):
+            hp, max_hp = entity.fighter.hp, entity.fighter.max_hp
+            defense, power = entity.fighter.base_defense, entity.fighter.base_power
+            level, xp = entity.level.current_level, entity.level.current_xp
+            ai, ai_turns = _ai_state(entity.ai)
+            enemy = _hostile_ai(entity.ai)
+            if enemy is not None:
+                path = add_path(enemy.path, None) if enemy.path else -1
+                path_position = enemy.path_index
+            if holder < 0 and entity in schedule_ranks:
+                delay = game_map.scheduler.delay_of(entity)
+                schedule = schedule_ranks[entity]
+        x, y = (entity.x, entity.y) if holder < 0 else (0, 0)
+        rows.append(
+            (
+                prototype_index[entity.prototype_id],
+                x,
+                y,
+                holder,
+                equipped,
+                hp,
+                max_hp,
+                defense,
+                power,
+                level,
+                xp,
+                ai,
+                ai_turns,
+                delay,
+                schedule,
+                path,
+                path_position,
+            )
+        )
+        return len(rows) - 1
+
+    actor_rows = []
+    for entity in game_map.entities:
+        row = add_row(entity, -1, False)
+        if isinstance(entity, Actor):
+            actor_rows.append((entity, row))
+    for actor, row in actor_rows:
+        for item in actor.inventory.items:
+            add_row(item, row, actor.equipment.item_is_equipped(item))
+    player_row = next(row for actor, row in actor_rows if actor is engine.player)
+
+    rng_version, rng_state, rng_gauss = game_map.rng.getstate()
+    header = {
+        "world": {
+            "map_width": world.map_width,
+            "map_height": world.map_height,
+            "max_rooms": world.max_rooms,
+            "room_min_size": world.room_min_size,
+            "room_max_size": world.room_max_size,
+            "current_floor": world.current_floor,
+            "seed": world.seed,
+            "prefetch": world.prefetch,
+        },
+        "map": {
+            "width": game_map.width,
+            "height": game_map.height,
+            "seed": game_map.seed,
+            "entrance_location": game_map.entrance_location,
+            "downstairs_location": game_map.downstairs_location,
+            "rng_version": rng_version,
+            "rng_gauss": rng_gauss,
+        },
+        "prototypes": prototype_ids,
+        "player": player_row,
+        "turn_count": engine.turn_count,
+    }
+    sections: Dict[str, Section] = {
+        "tiles": tile_ids,
+        "explored": np.packbits(game_map.explored.ravel(order="F")),
+        "entities": np.array(rows, dtype=entity_dt),
+        "rng": np.array(rng_state, dtype=np.uint32),
+        "messages": [[message.plain_text, message.fg, message.count] for message in engine.message_log.messages],
+        "paths": np.array(path_rows, dtype=path_dt),
+        "path_steps": np.array(path_steps, dtype=path_step_dt),
+    }
+    return Snapshot(header, sections)
+
+
+def write(data: Snapshot, filename: str, codec: str = DEFAULT_CODEC) -> None:
+    """Encode and write a snapshot to `filename`.
+
+    The file is written under a temporary name first, so an existing save is only replaced by a complete one.
+    """
+    compress, _ = CODECS[codec]
+    section_info: Dict[str, Dict[str, Any]] = {}
+    blobs: List[bytes] = []
+    offset = 0
+    for name, section in data.sections.items():
+        info: Dict[str, Any] = {}
+        if isinstance(section, np.ndarray):
+            info["dtype"] = np.lib.format.dtype_to_descr(section.dtype)
+            info["shape"] = section.shape
+            raw = section.tobytes(order="F")
+        else:
+            raw = json.dumps(section).encode("utf-8")
+        blob = compress(raw)
+        info["offset"], info["length"] = offset, len(blob)
+        section_info[name] = info
+        blobs.append(blob)
+        offset += len(blob)
+
+    header = json.dumps({**data.header, "codec": codec, "sections": section_info}).encode("utf-8")
+    # A unique temporary name, so that saves from different threads do not write over each other's files.
+    fd, temp_filename = tempfile.mkstemp(
+        prefix=os.path.basename(filename), suffix=".tmp", dir=os.path.dirname(os.path.abspath(filename))
+    )
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(_PREAMBLE.pack(MAGIC, VERSION, len(header)))
+            f.write(header)
+            for blob in blobs:
+                f.write(blob)
+        os.replace(temp_filename, filename)
+    except BaseException:
+        os.remove(temp_filename)
+        raise
+
+
+def save(engine: Engine, filename: str, codec: str = DEFAULT_CODEC) -> None:
+    """Save the game of `engine` to `filename`."""
+    write(snapshot(engine), filename, codec)
+
+
+def _read_section(f: BinaryIO, filename: str, info: Dict[str, Any], data_start: int, codec: str, mmap: bool) -> Any:
+    _, decompress = CODECS[codec]
+    offset = data_start + info["offset"]
+    if "dtype" in info:
+        descr = info["dtype"]
+        dtype = np.dtype(descr if isinstance(descr, str) else [tuple(field) for field in descr])
+        shape = tuple(info["shape"])
+        if mmap and codec == "none" and info["length"]:
+            return np.memmap(filename, dtype=dtype, mode="r", offset=offset, shape=shape, order="F")
+        f.seek(offset)
+        return np.frombuffer(decompress(f.read(info["length"])), dtype=dtype).reshape(shape, order="F")
+    f.seek(offset)
+    return json.loads(decompress(f.read(info["length"])))
+
+
+def read(filename: str, mmap: bool = False) -> Snapshot:
+    """Read a snapshot from `filename`.
+
+    If `mmap` is True then the NumPy sections of uncompressed saves are memory-mapped instead of read.
+    """
+    with open(filename, "rb") as f:
+        preamble = f.read(_PREAMBLE.size)
+        if len(preamble) < _PREAMBLE.size or not preamble.startswith(MAGIC):
+            # Older versions of the game pickled the whole Engine, those saves can not be loaded.
+            raise ValueError(f"{filename} is not a save file, or is from an older version of the game.")
+        magic, version, header_length = _PREAMBLE.unpack(preamble)
+        if version > VERSION:
+            raise ValueError(f"{filename} is from a newer version of the game (format {version}).")
+        header = json.loads(f.read(header_length))
+        data_start = _PREAMBLE.size + header_length
+        sections = {
+            name: _read_section(f, filename, info, data_start, header["codec"], mmap)
+            for name, info in header["sections"].items()
+        }
+    return Snapshot(header, sections)
+
+
+def _new_entity(prototype: Entity, row: Dict[str, Any]) -> Entity:
+    """Return a copy of `prototype` with the state stored in `row`."""
+    entity = prototype.copy()
+    entity.x, entity.y = row["x"], row["y"]
+    if isinstance(entity, Actor):
+        entity.fighter.max_hp = row["max_hp"]
+        entity.fighter.base_defense = row["base_defense"]
+        entity.fighter.base_power = row["base_power"]
+        entity.level.current_level = row["level"]
+        entity.level.current_xp = row["xp"]
+        if row["ai"] == AI_NONE:
+            entity.fighter.leave_corpse()
+        elif row["ai"] == AI_CONFUSED:
+            entity.ai = ConfusedEnemy(entity, entity.ai, row["ai_turns"])
+        entity.fighter.hp = row["hp"]
+    return entity
+
+
+def restore(data: Snapshot) -> Engine:
+    """Return a new Engine with the game stored in a snapshot."""
+    header = data.header
+    sections: Dict[str, Any] = data.sections
+    map_info = header["map"]
+    prototypes = [entity_factories.prototypes[prototype_id] for prototype_id in header["prototypes"]]
+
+    table = sections["entities"]
+    columns = {name: table[name].tolist() for name in table.dtype.names or ()}
+    rows = [{name: column[i] for name, column in columns.items()} for i in range(len(table))]
+    entities = [_new_entity(prototypes[row["prototype"]], row) for row in rows]
+
+    player = entities[header["player"]]
+    assert isinstance(player, Actor)
+    engine = Engine(player=player)
+    engine.turn_count = header["turn_count"]
+    engine.game_world = GameWorld(engine=engine, **header["world"])
+
+    game_map = GameMap(engine, map_info["width"], map_info["height"], seed=map_info["seed"])
+    game_map.set_tiles((slice(None), slice(None)), tile_types.TILES_BY_ID[sections["tiles"]])
+    explored = np.unpackbits(sections["explored"], count=game_map.width * game_map.height).astype(bool)
+    game_map.explored[:] = explored.reshape((game_map.width, game_map.height), order="F")
+    (entrance_x, entrance_y), (stairs_x, stairs_y) = map_info["entrance_location"], map_info["downstairs_location"]
+    game_map.entrance_location = entrance_x, entrance_y
+    game_map.downstairs_location = stairs_x, stairs_y
+    rng_state = tuple(sections["rng"].tolist())
+    game_map.rng.setstate((map_info["rng_version"], rng_state, map_info["rng_gauss"]))
+    engine.game_map = game_map
+
+    for entity, row in zip(entities, rows):
+        if row["holder"] < 0:
+            entity.place(entity.x, entity.y, game_map)
+            continue
+        holder = entities[row["holder"]]
+        assert isinstance(holder, Actor) and isinstance(entity, Item)
+        entity.parent = holder.inventory
+        holder.inventory.items.append(entity)
+        if row["equipped"]:
+            holder.equipment.toggle_equip(entity, add_message=False)
+
+    # Restore the turn order.  Living actors which weren't scheduled were dormant.
+    scheduled = []
+    for entity, row in zip(entities, rows):
+        if isinstance(entity, Actor) and row["holder"] < 0 and entity in game_map.scheduler:
+            game_map.scheduler.remove(entity)
+            if row["schedule"] < 0:
+                game_map.set_dormant(entity)
+            else:
+                scheduled.append((row["schedule"], row["delay"], entity))
+    for _, delay, actor in sorted(scheduled, key=lambda item: item[0]):
+        game_map.scheduler.add(actor, delay)
+
+    steps = sections["path_steps"]
+    paths: List[Path] = []
+    offset = 0
+    for length, cached in sections["paths"].tolist():
+        path_steps = steps[offset : offset + length]
+        offset += length
+        paths.append(tuple(zip(path_steps["x"].tolist(), path_steps["y"].tolist())))
+        if cached:
+            game_map.path_cache.add(CachedPath(paths[-1], path_steps["cost"].tobytes()))
+    for entity, row in zip(entities, rows):
+        enemy = _hostile_ai(entity.ai) if isinstance(entity, Actor) else None
+        if enemy is not None:
+            enemy.path = paths[row["path"]] if row["path"] >= 0 else EMPTY_PATH
+            enemy.path_index = row["path_index"]
+
+    for text, (r, g, b), count in sections["messages"]:
+        message = Message(text, (r, g, b))
+        message.count = count
+        engine.message_log.messages.append(message)
+
+    engine.update_fov()
+    engine.game_world.prefetch_next_floor()
+    return engine
+
+
+def load(filename: str, mmap: bool = False) -> Engine:
+    """Load the game saved in `filename`."""
+    return restore(read(filename, mmap))
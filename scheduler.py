@@ -0,0 +1,88 @@
+"""A priority queue of the actors on a map, ordered by the time they next act at."""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List
+import heapq
+import itertools
+
+if TYPE_CHECKING:
+    from entity import Actor
+
+# The speed of an actor which acts once per player turn.
+NORMAL_SPEED = 100
+
+# The time which passes during one player turn.
+TURN_TIME = 100
+
+
+def act_delay(speed: int) -> int:
+    """Return the time between the actions of an actor with this speed."""
+    return max(1, TURN_TIME * NORMAL_SPEED // max(1, speed))
+
+
+class TurnScheduler:
+    """Schedules the turns of the actors on a map other than the player.
+
+    Entries are `[time, sequence, actor]` lists on a heap.  The sequence number breaks ties between actors acting at
+    the same time in the order they were scheduled, so the order actors act in is the same every time a game is
+    played.  Removed actors have their entry's actor set to None and are discarded when they reach the top.
+    """
+
+    def __init__(self) -> None:
+        self.time = 0  # The time at the start of the current turn.
+        self._heap: List[List[Any]] = []
+        self._entries: Dict[Actor, List[Any]] = {}
+        self._sequence = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, actor: Actor) -> bool:
+        return actor in self._entries
+
+    def add(self, actor: Actor, delay: int = 0) -> None:
+        """Schedule an actor to act `delay` after the start of the current turn.  Does nothing if it's scheduled."""
+        if actor not in self._entries:
+            self._push(actor, self.time + delay)
+
+    def remove(self, actor: Actor) -> None:
+        """Stop scheduling an actor.  Does nothing if it isn't scheduled."""
+        entry = self._entries.pop(actor, None)
+        if entry is not None:
+            entry[2] = None
+
+    def ranks(self) -> Dict[Actor, int]:
+        """Return the position of each scheduled actor in the order they act in."""
+        entries = sorted(self._entries.values(), key=lambda entry: (entry[0], entry[1]))
+        return {entry[2]: rank for rank, entry in enumerate(entries)}
+
+    def delay_of(self, actor: Actor) -> int:
+        """Return how long after the start of the current turn a scheduled actor acts."""
+        return int(self._entries[actor][0]) - self.time
+
+    def _push(self, actor: Actor, time: int) -> None:
+        entry = [time, next(self._sequence), actor]
+        self._entries[actor] = entry
+        heapq.heappush(self._heap, entry)
+
+    def take_turn(self) -> Iterator[Actor]:
+        """Yield the actors which act during this turn, in order, then advance to the next turn.
+
+        Each actor is rescheduled after the caller is done with it, using its speed at that point.
+        An actor which acts faster than once per turn can be yielded more than once.
+        """
+        end = self.time + TURN_TIME
+        heap = self._heap
+        while heap and heap[0][0] < end:
+            entry = heapq.heappop(heap)
+            time, _, actor = entry
+            if actor is None:
+                continue  # A removed actor.
+            yield actor  # The actor stays in `_entries` while it acts, so that `remove` still applies to it.
+            if entry[2] is None:
+                continue  # Removed while it was acting.
+            if actor.is_alive:
+                self._push(actor, time + act_delay(actor.speed))
+            else:
+                del self._entries[actor]
+        self.time = end
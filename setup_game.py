@@ -1,10 +1,10 @@
 """Handle the loading and initialization of game sessions."""
+
 from __future__ import annotations
 
-from typing import Optional
-import copy
-import lzma
-import pickle
+from typing import List, Optional
+import os
+import sys
 import traceback
 
 from PIL import Image  # type: ignore
@@ -15,21 +15,28 @@
 import color
 import entity_factories
 import input_handlers
+import journal
+import savefile
 
 # Load the background image.  Pillow returns an object convertable into a NumPy array.
 background_image = Image.open("data/menu_background.png")
 
 
-def new_game() -> Engine:
-    """Return a brand new game session as an Engine instance."""
-    map_width = 80
-    map_height = 43
-
-    room_max_size = 10
-    room_min_size = 6
-    max_rooms = 30
+def new_game(
+    *,
+    map_width: int = 80,
+    map_height: int = 43,
+    room_max_size: int = 10,
+    room_min_size: int = 6,
+    max_rooms: int = 30,
+    prefetch_floors: bool = True,
+    seed: Optional[int] = None,
+) -> Engine:
+    """Return a brand new game session as an Engine instance.
 
-    player = copy.deepcopy(entity_factories.player)
+    Games started with the same `seed` generate the same floors.
+    """
+    player = entity_factories.player.copy()
 
     engine = Engine(player=player)
 
@@ -40,6 +47,8 @@ def new_game() -> Engine:
         room_max_size=room_max_size,
         map_width=map_width,
         map_height=map_height,
+        seed=seed,
+        prefetch=prefetch_floors,
     )
 
     engine.game_world.generate_floor()
@@ -47,8 +56,8 @@ def new_game() -> Engine:
 
     engine.message_log.add_message("Hello and welcome, adventurer, to yet another dungeon!", color.welcome_text)
 
-    dagger = copy.deepcopy(entity_factories.dagger)
-    leather_armor = copy.deepcopy(entity_factories.leather_armor)
+    dagger = entity_factories.dagger.copy()
+    leather_armor = entity_factories.leather_armor.copy()
 
     dagger.parent = player.inventory
     leather_armor.parent = player.inventory
@@ -64,9 +73,73 @@ def new_game() -> Engine:
 
 def load_game(filename: str) -> Engine:
     """Load an Engine instance from a file."""
-    with open(filename, "rb") as f:
-        engine = pickle.loads(lzma.decompress(f.read()))
-    assert isinstance(engine, Engine)
+    return savefile.load(filename)
+
+
+def new_game_from_journal(header: journal.JournalHeader, *, prefetch_floors: bool = True) -> Engine:
+    """Return a new game with the seed and settings of a journal, which the journal can be replayed onto."""
+    return new_game(
+        seed=header.seed,
+        map_width=header.map_width,
+        map_height=header.map_height,
+        max_rooms=header.max_rooms,
+        room_min_size=header.room_min_size,
+        room_max_size=header.room_max_size,
+        prefetch_floors=prefetch_floors,
+    )
+
+
+def continue_game(filename: str, journal_filename: str) -> Engine:
+    """Load a saved game, replay any turns recorded in its journal after it was saved, and keep recording to it.
+
+    If there is no save of the journal's game and the journal was started with a new game, such as after a crash
+    before the first autosave, then the journal is replayed onto a new game instead.
+    """
+    header: Optional[journal.JournalHeader] = None
+    records: List[journal.Record] = []
+    if os.path.exists(journal_filename):
+        try:
+            header, records = journal.read(journal_filename)
+        except journal.ReplayError as exc:
+            print(f"Discarding journal: {exc}", file=sys.stderr)
+            journal.remove(journal_filename)
+
+    engine: Optional[Engine] = None
+    if os.path.exists(filename) or header is None or header.start_turn:
+        engine = load_game(filename)  # Raises FileNotFoundError if there is neither a save nor a usable journal.
+    if header is not None and (engine is None or not journal.matches(header, engine)):
+        if header.start_turn == 0:
+            engine = new_game_from_journal(header)
+        else:
+            print("Discarding journal: The journal is from another game.", file=sys.stderr)
+            journal.remove(journal_filename)
+            header = None
+    assert engine is not None
+
+    if header is not None:
+        try:
+            turns = journal.replay(engine, records)
+        except journal.ReplayError as exc:
+            print(f"Discarding journal: {exc}", file=sys.stderr)
+            journal.remove(journal_filename)
+        else:
+            if turns:
+                engine.message_log.add_message(f"Recovered {turns} turns from the journal.", color.welcome_text)
+    engine.journal = journal.Journal(journal_filename, engine)
+    return engine
+
+
+def new_journaled_game(filename: str, journal_filename: str) -> Engine:
+    """Return a new game which records its actions to a new journal.
+
+    The save of the previous game is deleted, so the new game can be recovered from its journal alone until it's
+    saved.
+    """
+    engine = new_game()
+    if os.path.exists(filename):
+        os.remove(filename)
+    journal.remove(journal_filename)
+    engine.journal = journal.Journal(journal_filename, engine)
     return engine
 
 
@@ -109,13 +182,13 @@ def ev_keydown(self, event: tcod.event.KeyDown) -> Optional[input_handlers.BaseE
             raise SystemExit()
         elif event.sym == tcod.event.K_c:
             try:
-                return input_handlers.MainGameEventHandler(load_game("savegame.sav"))
+                return input_handlers.MainGameEventHandler(continue_game("savegame.sav", "savegame.journal"))
             except FileNotFoundError:
                 return input_handlers.PopupMessage(self, "No saved game to load.")
             except Exception as exc:
                 traceback.print_exc()  # Print to stderr.
                 return input_handlers.PopupMessage(self, f"Failed to load save:\n{exc}")
         elif event.sym == tcod.event.K_n:
-            return input_handlers.MainGameEventHandler(new_game())
+            return input_handlers.MainGameEventHandler(new_journaled_game("savegame.sav", "savegame.journal"))
 
         return None
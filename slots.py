@@ -0,0 +1,40 @@
+"""Helpers for classes which store their attributes in `__slots__` instead of an instance dictionary."""
+from typing import Dict, List, Tuple, TypeVar
+
+T = TypeVar("T")
+
+# The slot names of each class copied by `shallow_copy`, including inherited slots, and whether it has a __dict__.
+_class_layouts: Dict[type, Tuple[Tuple[str, ...], bool]] = {}
+
+
+def _get_layout(cls: type) -> Tuple[Tuple[str, ...], bool]:
+    layout = _class_layouts.get(cls)
+    if layout is None:
+        names: List[str] = []
+        for klass in reversed(cls.__mro__):
+            klass_slots = klass.__dict__.get("__slots__", ())
+            names += [klass_slots] if isinstance(klass_slots, str) else klass_slots
+        has_dict = "__dict__" in names or any("__slots__" not in klass.__dict__ for klass in cls.__mro__[:-1])
+        layout = _class_layouts[cls] = (
+            tuple(name for name in names if name not in ("__dict__", "__weakref__")),
+            has_dict,
+        )
+    return layout
+
+
+def shallow_copy(obj: T) -> T:
+    """Return a shallow copy of `obj`, which is several times faster than `copy.copy`.
+
+    Slots which are not set on `obj` are not set on the copy either.
+    """
+    cls = type(obj)
+    names, has_dict = _get_layout(cls)
+    clone: T = object.__new__(cls)
+    for name in names:
+        try:
+            setattr(clone, name, getattr(obj, name))
+        except AttributeError:
+            pass  # An unset slot.
+    if has_dict:
+        clone.__dict__.update(obj.__dict__)
+    return clone
@@ -0,0 +1,160 @@
+from typing import Tuple
+import copy
+
+import numpy as np
+
+from components.ai import HostileEnemy
+from engine import Engine
+from entity import Actor
+from game_map import GameMap
+from path_cache import PathCache
+import entity_factories
+import tile_types
+
+
+def new_room_map(width: int = 20, height: int = 12) -> GameMap:
+    """Return a map with a single open room and the player placed in its corner."""
+    player = copy.deepcopy(entity_factories.player)
+    engine = Engine(player=player)
+    game_map = GameMap(engine, width, height)
+    game_map.set_tiles((slice(1, -1), slice(1, -1)), tile_types.floor)
+    engine.game_map = game_map
+    player.place(1, 1, game_map)
+    return game_map
+
+
+def enemy_ai(actor: Actor) -> HostileEnemy:
+    assert isinstance(actor.ai, HostileEnemy)
+    return actor.ai
+
+
+def chebyshev(actor: Actor, xy: Tuple[int, int]) -> int:
+    return max(abs(actor.x - xy[0]), abs(actor.y - xy[1]))
+
+
+def test_shared_path_matches_individual_path() -> None:
+    game_map = new_room_map()
+    engine = game_map.engine
+    orc = entity_factories.orc.spawn(game_map, 15, 8)
+    entity_factories.troll.spawn(game_map, 8, 4)  # Adds a crowd cost between the orc and the player.
+
+    shared_path = enemy_ai(orc).compute_path_to_player()[1:]
+    individual_path = enemy_ai(orc).get_path_to(engine.player.x, engine.player.y)
+    assert len(shared_path) == len(individual_path)
+    assert tuple(shared_path[-1]) == (engine.player.x, engine.player.y)
+
+
+def test_shared_pathfinder_is_per_turn() -> None:
+    game_map = new_room_map()
+    engine = game_map.engine
+    orc = entity_factories.orc.spawn(game_map, 15, 8)
+    troll = entity_factories.troll.spawn(game_map, 15, 2)
+    game_map.visible[:] = True
+
+    engine.handle_enemy_turns()
+    assert chebyshev(orc, (1, 1)) == 13
+    assert chebyshev(troll, (1, 1)) == 13
+
+    # The field is rebuilt on the next turn, so enemies follow the player when it moves.
+    engine.player.place(18, 10)
+    distance = chebyshev(orc, (18, 10))
+    engine.handle_enemy_turns()
+    assert chebyshev(orc, (18, 10)) == distance - 1
+
+
+def test_distant_enemies_go_dormant_and_wake() -> None:
+    game_map = new_room_map(width=40)
+    engine = game_map.engine
+    far_orc = entity_factories.orc.spawn(game_map, 35, 8)
+    near_orc = entity_factories.orc.spawn(game_map, 8, 8)
+    engine.update_fov()
+
+    engine.handle_enemy_turns()
+    assert game_map.is_dormant(far_orc)
+    assert far_orc not in game_map.scheduler
+    assert not game_map.is_dormant(near_orc)
+
+    # A dormant enemy doesn't act at all.
+    game_map.visible[:] = True
+    game_map.visible[35, 8] = False
+    engine.handle_enemy_turns()
+    assert (far_orc.x, far_orc.y) == (35, 8)
+
+    # Noise wakes it up.
+    near_orc.place(30, 8)
+    engine.player.place(31, 8)
+    assert game_map.wake_actors(31, 8, radius=6) == 1
+    assert not game_map.is_dormant(far_orc) and far_orc in game_map.scheduler
+
+
+def test_dormant_enemies_wake_in_view() -> None:
+    game_map = new_room_map(width=40)
+    engine = game_map.engine
+    orc = entity_factories.orc.spawn(game_map, 35, 8)
+    engine.handle_enemy_turns()
+    assert game_map.is_dormant(orc)
+
+    game_map.visible[35, 8] = True
+    engine.handle_enemy_turns()
+    assert not game_map.is_dormant(orc)
+    assert chebyshev(orc, (1, 1)) == 33  # It woke up and started chasing the player.
+
+
+def test_paths_are_reused_while_walkable() -> None:
+    game_map = new_room_map()
+    engine = game_map.engine
+    # A corridor along y=1 with the player at its end, an orc in front of it and more queued up behind.
+    game_map.set_tiles((slice(1, -1), slice(2, -1)), tile_types.wall)
+    engine.player.fighter.max_hp = engine.player.fighter.hp = 10**6
+    orcs = [entity_factories.orc.spawn(game_map, x, 1) for x in range(2, 6)]
+    game_map.visible[:] = True
+
+    engine.handle_enemy_turns()
+    misses = game_map.path_cache.misses
+    assert misses == len(orcs) - 1  # The front orc attacks instead.
+    assert game_map.path_cache.hits == 0
+
+    for _ in range(3):
+        engine.handle_enemy_turns()
+    assert game_map.path_cache.misses == misses
+    assert game_map.path_cache.hits == 3 * (len(orcs) - 1)
+    assert [(orc.x, orc.y) for orc in orcs] == [(x, 1) for x in range(2, 6)]
+    path = enemy_ai(orcs[-1]).compute_path_to_player()[1:]
+    assert list(enemy_ai(orcs[-1]).get_cached_path_to_player()[1:]) == list(map(tuple, path.tolist()))
+
+
+def test_paths_are_followed_until_blocked() -> None:
+    game_map = new_room_map()
+    engine = game_map.engine
+    engine.player.fighter.max_hp = engine.player.fighter.hp = 10**6
+    orc = entity_factories.orc.spawn(game_map, 18, 1)
+    game_map.visible[:] = True
+
+    engine.handle_enemy_turns()
+    path = enemy_ai(orc).path
+    assert path[0] == (18, 1) and path[-1] == (1, 1)
+    assert (orc.x, orc.y) == path[1] and enemy_ai(orc).path_index == 2
+    for _ in range(5):
+        engine.handle_enemy_turns()
+    assert enemy_ai(orc).path is path and (orc.x, orc.y) == path[6]
+    assert (game_map.path_cache.hits, game_map.path_cache.misses) == (5, 1)
+
+    # A troll steps onto the rest of the path, so a new path is found around it.
+    entity_factories.troll.spawn(game_map, *path[9])
+    engine.handle_enemy_turns()
+    assert enemy_ai(orc).path is not path and path[9] not in enemy_ai(orc).path
+    assert game_map.path_cache.misses == 3  # The new path of the orc, and the first path of the troll.
+
+
+def test_path_cache_evicts_least_recently_used() -> None:
+    path_cost = np.ones((4, 4), dtype=np.int8)
+    cache = PathCache(max_paths=2)
+    first = cache.put(np.array([(0, 0), (1, 1)]), path_cost)
+    cache.put(np.array([(0, 0), (1, 1), (2, 2)]), path_cost)
+    assert cache.get((0, 0), (1, 1), path_cost) == first == ((0, 0), (1, 1))
+    third = cache.put(np.array([(0, 0), (1, 0), (2, 1), (3, 2)]), path_cost)
+    assert cache.get((0, 0), (2, 2), path_cost) is None
+    assert cache.follow(third, 2, path_cost)  # Following the rest of a path.
+    path_cost[3, 2] = 0
+    assert not cache.follow(third, 2, path_cost)
+    assert len(cache) == 1
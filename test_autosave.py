@@ -0,0 +1,37 @@
+from pathlib import Path
+
+from autosave import Autosaver
+import input_handlers
+import savefile
+import setup_game
+
+
+def test_autosave_every_n_turns(tmp_path: Path) -> None:
+    filename = tmp_path / "autosave.sav"
+    autosaver = Autosaver(str(filename), every_turns=3, every_seconds=3600)
+    engine = setup_game.new_game(seed=1, prefetch_floors=False)
+    handler = input_handlers.MainGameEventHandler(engine)
+
+    assert not autosaver.poll(handler)  # The first poll of a game starts counting turns.
+    for _ in range(2):
+        engine.handle_enemy_turns()
+        assert not autosaver.poll(handler)
+    engine.handle_enemy_turns()
+    assert autosaver.poll(handler)
+    autosaver.wait()
+
+    assert savefile.load(str(filename)).turn_count == 3
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_autosave_only_from_main_game(tmp_path: Path) -> None:
+    filename = tmp_path / "autosave.sav"
+    autosaver = Autosaver(str(filename), every_turns=1)
+    engine = setup_game.new_game(seed=1, prefetch_floors=False)
+    autosaver.poll(input_handlers.MainGameEventHandler(engine))
+    engine.handle_enemy_turns()
+
+    assert not autosaver.poll(input_handlers.InventoryActivateHandler(engine))
+    engine.player.fighter.take_damage(engine.player.fighter.max_hp)
+    assert not autosaver.poll(input_handlers.MainGameEventHandler(engine))
+    assert not filename.exists()
@@ -0,0 +1,17 @@
+import copy
+
+import benchmarks
+
+
+def test_benchmarks_run_and_compare() -> None:
+    cases = benchmarks.collect_benchmarks(map_sizes=[(40, 30)], entity_counts=[5], message_counts=[10])
+    assert len(cases) == 7
+    results = benchmarks.run_benchmarks(cases, repeat=1, min_time=0.0)
+    assert set(results["benchmarks"]) == {name for name, _, _ in cases}
+    assert benchmarks.compare(results, results, tolerance=0.25) == []
+
+    baseline = copy.deepcopy(results)
+    baseline["benchmarks"]["update_fov[40x30]"]["median"] /= 10
+    regressions = benchmarks.compare(results, baseline, tolerance=0.25)
+    assert len(regressions) == 1
+    assert regressions[0].startswith("update_fov[40x30]")
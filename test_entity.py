@@ -0,0 +1,34 @@
+from components.ai import HostileEnemy
+import entity_factories
+import setup_game
+
+
+def test_copy_shares_only_immutable_data() -> None:
+    engine = setup_game.new_game(seed=1, prefetch_floors=False)
+    orc = entity_factories.orc.spawn(engine.game_map, 1, 1)
+    other = entity_factories.orc.spawn(engine.game_map, 2, 1)
+
+    assert orc.name is other.name and orc.color is other.color
+    assert orc.prototype_id == "orc"
+    for component in ["fighter", "inventory", "equipment", "level"]:
+        assert getattr(orc, component) is not getattr(other, component)
+        assert getattr(orc, component).parent is orc
+    assert isinstance(orc.ai, HostileEnemy) and orc.ai.entity is orc
+    template_ai = entity_factories.orc.ai
+    assert isinstance(template_ai, HostileEnemy) and orc.ai is not template_ai
+
+    orc.fighter.take_damage(3)
+    assert other.fighter.hp == other.fighter.max_hp == entity_factories.orc.fighter.hp
+
+
+def test_copy_equips_copied_items() -> None:
+    player = setup_game.new_game(seed=1, prefetch_floors=False).player
+    clone = player.copy()
+
+    assert [item.name for item in clone.inventory.items] == ["Dagger", "Leather Armor"]
+    for item, item_copy in zip(player.inventory.items, clone.inventory.items):
+        assert item_copy is not item
+        assert item_copy.parent is clone.inventory
+        assert item_copy.equippable is not None and item_copy.equippable.parent is item_copy
+    assert clone.equipment.weapon is clone.inventory.items[0]
+    assert clone.equipment.armor is clone.inventory.items[1]
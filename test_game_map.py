@@ -0,0 +1,296 @@
+import copy
+import random
+import threading
+
+from tcod.map import compute_fov
+import numpy as np
+import tcod
+
+from engine import Engine
+from entity import Actor
+from game_map import CROWD_COST, GameMap
+from render_order import RenderOrder
+import entity_factories
+import setup_game
+import tile_types
+
+
+def new_map(width: int = 10, height: int = 10) -> GameMap:
+    player = copy.deepcopy(entity_factories.player)
+    engine = Engine(player=player)
+    game_map = GameMap(engine, width, height)
+    engine.game_map = game_map
+    player.place(1, 1, game_map)
+    return game_map
+
+
+def test_entity_location_index() -> None:
+    game_map = new_map()
+    player = game_map.engine.player
+    orc = entity_factories.orc.spawn(game_map, 3, 4)
+    potion = entity_factories.health_potion.spawn(game_map, 3, 4)
+
+    assert game_map.get_entities_at_location(3, 4) == {orc, potion}
+    assert game_map.get_blocking_entity_at_location(3, 4) is orc
+    assert game_map.get_actor_at_location(3, 4) is orc
+    assert list(game_map.get_items_at_location(3, 4)) == [potion]
+    assert game_map.get_actor_at_location(1, 1) is player
+
+    orc.move(1, 0)
+    assert game_map.get_entities_at_location(3, 4) == {potion}
+    assert game_map.get_actor_at_location(4, 4) is orc
+
+    player.place(5, 5)
+    assert not game_map.get_entities_at_location(1, 1)
+    assert game_map.get_actor_at_location(5, 5) is player
+
+    game_map.remove_entity(potion)
+    assert not game_map.get_entities_at_location(3, 4)
+    assert potion not in game_map.entities
+
+
+def test_entity_location_index_across_maps() -> None:
+    game_map = new_map()
+    player = game_map.engine.player
+    other_map = GameMap(game_map.engine, 10, 10)
+
+    player.place(2, 2, other_map)
+    assert player not in game_map.entities
+    assert not game_map.get_entities_at_location(1, 1)
+    assert other_map.get_actor_at_location(2, 2) is player
+
+
+def test_dead_actor_is_not_blocking() -> None:
+    game_map = new_map()
+    orc = entity_factories.orc.spawn(game_map, 3, 4)
+
+    orc.fighter.take_damage(orc.fighter.max_hp)
+    assert game_map.get_blocking_entity_at_location(3, 4) is None
+    assert game_map.get_actor_at_location(3, 4) is None
+    assert game_map.get_entities_at_location(3, 4) == {orc}
+
+
+def test_path_cost_follows_blocking_entities() -> None:
+    game_map = new_map()
+    game_map.set_tiles((slice(1, 9), slice(1, 9)), tile_types.floor)
+    assert game_map.path_cost[0, 0] == 0
+    assert game_map.path_cost[1, 1] == 1 + CROWD_COST  # The player.
+    assert game_map.path_cost[2, 2] == 1
+
+    orc = entity_factories.orc.spawn(game_map, 3, 4)
+    assert game_map.path_cost[3, 4] == 1 + CROWD_COST
+
+    orc.move(1, 1)
+    assert game_map.path_cost[3, 4] == 1
+    assert game_map.path_cost[4, 5] == 1 + CROWD_COST
+
+    # Changing the tiles under an entity keeps its crowd cost.
+    game_map.set_tiles((slice(3, 6), slice(3, 6)), tile_types.floor)
+    assert game_map.path_cost[4, 5] == 1 + CROWD_COST
+
+    # Every blocking entity on a changed tile counts, including tiles repeated by a fancy index.
+    troll = entity_factories.troll.spawn(game_map, 4, 5)
+    game_map.set_tiles(([4, 4, 6], [5, 5, 6]), tile_types.floor)
+    assert game_map.path_cost[4, 5] == 1 + 2 * CROWD_COST
+    troll.fighter.take_damage(troll.fighter.max_hp)
+
+    orc.fighter.take_damage(orc.fighter.max_hp)
+    assert game_map.path_cost[4, 5] == 1
+
+    game_map.engine.player.place(0, 0, GameMap(game_map.engine, 10, 10))
+    assert game_map.path_cost[1, 1] == 1
+
+
+def test_windowed_fov_matches_full_fov() -> None:
+    engine = setup_game.new_game(seed=3)
+    game_map = engine.game_map
+    floor_xs, floor_ys = np.nonzero(game_map.tiles["walkable"])
+
+    game_map.explored[:] = False
+    explored = np.zeros_like(game_map.explored)
+    for i in random.Random(3).sample(range(len(floor_xs)), k=50):
+        x, y = int(floor_xs[i]), int(floor_ys[i])
+        engine.player.place(x, y)
+        engine.update_fov()
+        expected = compute_fov(game_map.tiles["transparent"], (x, y), radius=8)
+        explored |= expected
+        assert (game_map.visible == expected).all()
+    assert (game_map.explored == explored).all()
+
+
+def test_fov_is_skipped_when_nothing_changed() -> None:
+    game_map = new_map()
+    game_map.set_tiles((slice(1, 9), slice(1, 9)), tile_types.floor)
+    game_map.update_fov(1, 1, radius=8)
+    assert game_map.visible[5, 5]
+
+    game_map.visible[5, 5] = False
+    game_map.update_fov(1, 1, radius=8)
+    assert not game_map.visible[5, 5]  # Same origin and tiles, so the FOV was not recomputed.
+
+    game_map.set_tiles((7, 1), tile_types.wall)
+    game_map.update_fov(1, 1, radius=8)
+    assert game_map.visible[5, 5]
+
+
+def test_next_floor_is_prefetched() -> None:
+    engine = setup_game.new_game()
+    world = engine.game_world
+    assert world._prefetched is not None
+    floor_number, future = world._prefetched
+    assert floor_number == 2
+    next_map = future.result()
+
+    world.generate_floor()
+    assert world.current_floor == 2
+    assert engine.game_map is next_map
+    assert engine.player.gamemap is next_map
+    assert (engine.player.x, engine.player.y) == next_map.entrance_location
+
+
+def test_pending_prefetch_is_waited_on() -> None:
+    engine = setup_game.new_game(prefetch_floors=False)
+    world = engine.game_world
+    started = threading.Event()
+    release = threading.Event()
+    generate_dungeon = world._generate_dungeon
+    calls = []
+
+    def slow_generate_dungeon(floor_number: int) -> GameMap:
+        calls.append(floor_number)
+        started.set()
+        release.wait()
+        return generate_dungeon(floor_number)
+
+    world._generate_dungeon = slow_generate_dungeon  # type: ignore
+    world.prefetch = True
+    world.prefetch_next_floor()
+    assert started.wait(5)
+    threading.Timer(0.05, release.set).start()
+    world.generate_floor()
+    assert world.current_floor == 2
+    assert world._prefetched is not None
+    world._prefetched[1].result()
+    assert calls == [2, 3]  # Floor 2 was only generated by the prefetch, then floor 3 was prefetched.
+
+
+def test_floor_is_generated_without_prefetch() -> None:
+    engine = setup_game.new_game(prefetch_floors=False)
+    world = engine.game_world
+    assert world._prefetched is None
+
+    first_map = engine.game_map
+    world.generate_floor()
+    assert world.current_floor == 2
+    assert engine.game_map is not first_map
+    assert engine.player in engine.game_map.entities
+    assert engine.player not in first_map.entities
+
+
+def assert_actor_table_matches(game_map: GameMap) -> None:
+    table = game_map.actor_table
+    actors = [entity for entity in game_map.entities if isinstance(entity, Actor)]
+    assert len(table) == len(actors)
+    for actor in actors:
+        handle = actor.table_handle
+        assert table.actors[handle] is actor and table.used[handle]
+        assert (table.x[handle], table.y[handle], table.hp[handle]) == (actor.x, actor.y, actor.fighter.hp)
+        assert (table.blocks[handle], table.alive[handle]) == (actor.blocks_movement, actor.is_alive)
+
+
+def test_actor_table_follows_actors() -> None:
+    game_map = new_map()
+    player = game_map.engine.player
+    orc = entity_factories.orc.spawn(game_map, 3, 4)
+    troll = entity_factories.troll.spawn(game_map, 5, 5)
+    entity_factories.health_potion.spawn(game_map, 3, 4)
+    assert_actor_table_matches(game_map)
+
+    orc.move(1, 1)
+    player.place(2, 2)
+    troll.fighter.take_damage(3)
+    assert_actor_table_matches(game_map)
+
+    troll.fighter.take_damage(troll.fighter.max_hp)
+    assert not game_map.actor_table.alive[troll.table_handle]
+    assert_actor_table_matches(game_map)
+
+    handle = orc.table_handle
+    orc.place(1, 1, GameMap(game_map.engine, 10, 10))
+    assert not game_map.actor_table.used[handle]
+    assert_actor_table_matches(game_map)
+    assert_actor_table_matches(orc.gamemap)
+
+    # Freed handles are reused, and the table grows as needed.
+    orcs = [entity_factories.orc.spawn(game_map, i % 10, i // 10) for i in range(100)]
+    assert orcs[0].table_handle == handle
+    assert_actor_table_matches(game_map)
+
+
+def test_radius_and_nearest_actor_queries() -> None:
+    game_map = new_map()
+    player = game_map.engine.player
+    orc = entity_factories.orc.spawn(game_map, 3, 1)
+    troll = entity_factories.troll.spawn(game_map, 4, 4)
+    corpse = entity_factories.orc.spawn(game_map, 2, 2)
+    corpse.fighter.take_damage(corpse.fighter.max_hp)
+
+    assert game_map.get_actors_in_radius(2, 2, 1.5) == [player, orc]
+    assert game_map.get_actors_in_radius(3, 3, 2) == [orc, troll]
+    assert game_map.get_actors_in_radius(9, 9, 2) == []
+
+    game_map.visible[:] = True
+    assert game_map.get_nearest_visible_actor(1, 1, 10, exclude=player) is orc
+    assert game_map.get_nearest_visible_actor(1, 1, 2, exclude=player) is None
+    game_map.visible[3, 1] = False
+    assert game_map.get_nearest_visible_actor(1, 1, 10, exclude=player) is troll
+    assert game_map.get_nearest_visible_actor(1, 1, 10) is player
+
+
+def test_cached_graphics_match_full_composite() -> None:
+    engine = setup_game.new_game(seed=3, prefetch_floors=False)
+    game_map = engine.game_map
+    console = tcod.Console(game_map.width, game_map.height, order="F")
+    floor_xs, floor_ys = np.nonzero(game_map.tiles["walkable"])
+    rng = random.Random(5)
+    for _ in range(20):
+        i = rng.randrange(len(floor_xs))
+        engine.player.place(int(floor_xs[i]), int(floor_ys[i]))
+        engine.update_fov()
+        game_map.set_tiles((int(floor_xs[i]) + 1, int(floor_ys[i])), tile_types.down_stairs)
+        game_map.render(console)
+        expected = np.select(
+            condlist=[game_map.visible, game_map.explored],
+            choicelist=[game_map.tiles["light"], game_map.tiles["dark"]],
+            default=tile_types.SHROUD,
+        )
+        assert (console.rgb["bg"] == expected["bg"]).all()
+        assert not game_map._stale_regions
+
+
+def test_entities_render_in_render_order() -> None:
+    game_map = new_map()
+    game_map.set_tiles((slice(None), slice(None)), tile_types.floor)
+    player = game_map.engine.player
+    orc = entity_factories.orc.spawn(game_map, 3, 3)
+    corpse = entity_factories.troll.spawn(game_map, 3, 3)
+    entity_factories.health_potion.spawn(game_map, 3, 3)
+    entity_factories.sword.spawn(game_map, 5, 5)
+    entity_factories.orc.spawn(game_map, 8, 8)
+    game_map.engine.update_fov()
+    game_map.visible[:5, :5] = True
+    game_map.mark_stale()
+    corpse.fighter.die()
+    assert corpse in game_map.render_buckets[RenderOrder.CORPSE].entities
+
+    console = tcod.Console(10, 10, order="F")
+    expected = tcod.Console(10, 10, order="F")
+    for _ in range(2):  # The second frame is drawn from the cached arrays.
+        game_map.render(console)
+        expected.rgb[:] = game_map.update_graphics()
+        for entity in sorted(game_map.entities, key=lambda entity: entity.render_order.value):
+            if game_map.visible[entity.x, entity.y]:
+                expected.print(entity.x, entity.y, entity.char, fg=entity.color)
+        assert (console.rgb == expected.rgb).all()
+        assert chr(console.rgb["ch"][3, 3]) == orc.char
+        player.move(1, 0)
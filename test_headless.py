@@ -0,0 +1,10 @@
+import headless
+
+
+def test_headless_run() -> None:
+    stats = headless.run(turns=300, seed=1)
+    assert stats.turns == 300
+    assert stats.games >= 1
+    assert stats.phase_counts["handle_enemy_turns"] == 300
+    assert stats.phase_counts["update_fov"] == 300
+    assert stats.turns_per_second > 0
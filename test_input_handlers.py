@@ -0,0 +1,94 @@
+from pathlib import Path
+
+import pytest
+import tcod
+
+import exceptions
+import input_handlers
+import offscreen
+import setup_game
+
+
+def test_render_only_when_dirty() -> None:
+    engine = setup_game.new_game(seed=1, prefetch_floors=False)
+    console = tcod.Console(80, 50, order="F")
+    handler = input_handlers.MainGameEventHandler(engine)
+    assert handler.is_dirty()
+    handler.on_render(console)
+    handler.mark_clean()
+    assert not handler.is_dirty()
+
+    engine.mouse_location = engine.mouse_location
+    assert not handler.is_dirty()
+    engine.mouse_location = (3, 4)
+    assert handler.is_dirty()
+    handler.on_render(console)
+    handler.mark_clean()
+
+    engine.update_fov()  # Nothing moved, so the FOV is not recomputed.
+    assert not handler.is_dirty()
+    engine.message_log.add_message("Hello")
+    assert handler.is_dirty()
+    handler.on_render(console)
+    handler.mark_clean()
+
+    engine.handle_enemy_turns()
+    assert handler.is_dirty()
+    handler.on_render(console)
+    handler.mark_clean()
+
+    engine.player.move(1, 0)
+    assert engine.game_map.dirty
+
+
+def test_modal_handlers_track_their_own_state() -> None:
+    engine = setup_game.new_game(seed=1, prefetch_floors=False)
+    console = tcod.Console(80, 50, order="F")
+    viewer = input_handlers.HistoryViewer(engine)
+    popup = input_handlers.PopupMessage(viewer, "Popup")
+    popup.on_render(console)
+    popup.mark_clean()
+    assert not popup.is_dirty() and not viewer.is_dirty()
+
+    viewer.cursor = 0
+    viewer.dirty = True  # As set by HistoryViewer.ev_keydown.
+    assert popup.is_dirty()
+
+
+def test_menus_reuse_their_background() -> None:
+    engine = setup_game.new_game(seed=1, prefetch_floors=False)
+    console = tcod.Console(80, 50, order="F")
+    menu = input_handlers.InventoryActivateHandler(engine)
+    menu.on_render(console)
+    menu.mark_clean()
+    first_frame = console.rgb.copy()
+
+    engine.mouse_location = (10, 10)  # The snapshot doesn't follow the mouse.
+    assert not menu.is_dirty()
+    console.clear()
+    menu.on_render(console)
+    assert (console.rgb == first_frame).all()
+
+    engine.message_log.add_message("Invalid entry.")
+    assert menu.is_dirty()
+    menu.on_render(console)
+    assert not (console.rgb == first_frame).all()
+
+
+def test_console_pool_reuses_consoles_by_size() -> None:
+    pool = offscreen.ConsolePool()
+    console = pool.get(10, 5)
+    console.print(0, 0, "X")
+    assert pool.get(10, 5) is console
+    assert console.rgb["ch"][0, 0] == ord(" ")
+    assert pool.get(5, 10) is not console
+
+
+def test_quitting_a_finished_game_closes_its_journal(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.chdir(tmp_path)
+    engine = setup_game.new_journaled_game("savegame.sav", "savegame.journal")
+    journal_file = engine.journal.file if engine.journal else None
+    with pytest.raises(exceptions.QuitWithoutSaving):
+        input_handlers.GameOverEventHandler(engine).on_quit()
+    assert journal_file is not None and journal_file.closed
+    assert not (tmp_path / "savegame.journal").exists()
@@ -0,0 +1,113 @@
+from pathlib import Path
+from typing import List, Union
+
+from engine import Engine
+from headless import StairDiver
+import actions
+import headless
+import input_handlers
+import journal
+import setup_game
+
+
+def play(engine: Engine, turns: int) -> None:
+    """Play through the event handlers, which record to the engine's journal."""
+    policy = StairDiver()
+    for _ in range(turns):
+        if not engine.player.is_alive:
+            return
+        input_handlers.MainGameEventHandler(engine).handle_action(policy(engine))
+        if engine.player.level.requires_level_up:
+            # As chosen in LevelUpEventHandler.
+            assert engine.journal is not None
+            engine.journal.record_level_up(engine, 1)
+            journal.level_up(engine.player, 1)
+
+
+def describe(engine: Engine) -> object:
+    player = engine.player
+    return (
+        engine.turn_count,
+        engine.game_world.current_floor,
+        [(entity.name, entity.x, entity.y) for entity in engine.game_map.entities],
+        (player.fighter.hp, player.fighter.max_hp, player.fighter.power, player.level.current_level),
+        [item.name for item in player.inventory.items],
+        [message.full_text for message in engine.message_log.messages],
+    )
+
+
+def test_replay_reproduces_game(tmp_path: Path) -> None:
+    filename = str(tmp_path / "game.journal")
+    engine = setup_game.new_game(seed=2)
+    engine.journal = journal.Journal(filename, engine)
+    play(engine, 400)
+    engine.journal.close()
+
+    header, records = journal.read(filename)
+    assert header.seed == engine.game_world.seed
+    assert header.start_turn == 0
+    assert records
+
+    replayed = setup_game.new_game(seed=2)
+    assert journal.replay(replayed, records) == engine.turn_count
+    assert describe(replayed) == describe(engine)
+
+    stats = headless.replay(filename)
+    assert stats.turns == engine.turn_count
+
+
+def test_recover_from_save_and_journal(tmp_path: Path) -> None:
+    save_filename = str(tmp_path / "game.sav")
+    journal_filename = str(tmp_path / "game.journal")
+    engine = setup_game.new_game(seed=4)
+    engine.journal = journal.Journal(journal_filename, engine)
+    play(engine, 100)
+    engine.save_as(save_filename)
+    play(engine, 100)  # Lost in a crash, except for the journal.
+    engine.journal.close()
+
+    recovered = setup_game.continue_game(save_filename, journal_filename)
+    assert recovered.message_log.messages[-1].plain_text.startswith("Recovered")
+    recovered.message_log.messages.pop()
+    assert describe(recovered) == describe(engine)
+    assert recovered.journal is not None
+    recovered.journal.close()
+
+
+def test_recover_new_game_from_journal(tmp_path: Path) -> None:
+    save_filename = str(tmp_path / "game.sav")
+    journal_filename = str(tmp_path / "game.journal")
+    setup_game.new_game(seed=5, prefetch_floors=False).save_as(save_filename)  # The save of a previous game.
+    engine = setup_game.new_journaled_game(save_filename, journal_filename)
+    play(engine, 20)  # Lost in a crash before the first autosave, except for the journal.
+    assert engine.journal is not None
+    engine.journal.close()
+
+    for old_save in (False, True):
+        if old_save:
+            setup_game.new_game(seed=5, prefetch_floors=False).save_as(save_filename)
+        recovered = setup_game.continue_game(save_filename, journal_filename)
+        assert recovered.message_log.messages[-1].plain_text == "Recovered 20 turns from the journal."
+        recovered.message_log.messages.pop()
+        assert describe(recovered) == describe(engine)
+        assert recovered.journal is not None
+        recovered.journal.close()
+
+
+def test_item_actions_are_recorded_by_inventory_index() -> None:
+    engine = setup_game.new_game(seed=1, prefetch_floors=False)
+    player = engine.player
+    dagger, armor = player.inventory.items
+
+    item_actions: List[Union[actions.EquipAction, actions.ItemAction]] = [
+        actions.EquipAction(player, armor),
+        actions.DropItem(player, dagger),
+        actions.ItemAction(player, armor, (3, 4)),
+    ]
+    for action in item_actions:
+        record = journal.encode_action(engine, action)
+        decoded = journal.decode_action(engine, record)
+        assert type(decoded) is type(action)
+        assert isinstance(decoded, (actions.EquipAction, actions.ItemAction))
+        assert decoded.item is action.item
+    assert journal.encode_action(engine, actions.ItemAction(player, armor, (3, 4))).x == 3
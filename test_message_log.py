@@ -0,0 +1,35 @@
+from pathlib import Path
+
+import tcod
+
+from message_log import MessageLog
+
+
+def test_log_is_capped_and_spills_old_messages(tmp_path: Path) -> None:
+    spill = tmp_path / "messages.log"
+    log = MessageLog(max_messages=3, spill_filename=str(spill))
+    for text in ["a", "b", "b", "c", "d", "e"]:
+        log.add_message(text)
+
+    assert [message.full_text for message in log.messages] == ["c", "d", "e"]
+    assert spill.read_text(encoding="utf-8").splitlines() == ["a", "b (x2)"]
+
+
+def test_wrapped_lines_follow_the_count() -> None:
+    log = MessageLog()
+    log.add_message("The orc attacks you")
+    message = log.messages[-1]
+    assert message.wrap(12) == ["The orc", "attacks you"]
+    assert message.wrap(12) is message.wrap(12)
+    log.add_message("The orc attacks you")
+    assert message.wrap(12) == ["The orc", "attacks you", "(x2)"]
+
+
+def test_render_messages_from_index() -> None:
+    log = MessageLog()
+    for text in ["first", "second", "third"]:
+        log.add_message(text)
+    console = tcod.Console(10, 2, order="F")
+    log.render_messages(console, 0, 0, 10, 2, log.messages, last=1)
+    rows = ["".join(chr(c) for c in console.rgb["ch"][:, y]).rstrip() for y in range(2)]
+    assert rows == ["first", "second"]
@@ -1,9 +1,12 @@
-from typing import Dict
+from typing import Dict, List, Tuple
+import random
 
+from engine import Engine
 from entity import Entity
 from entity_curves import enemy_chances
-from procgen import get_entities_at_random
+from procgen import get_entities_at_random, tunnel_between
 import entity_factories
+import setup_game
 
 
 def count_generated_entities(total_entities: int, floor: int) -> Dict[Entity, int]:
@@ -38,3 +41,32 @@ def test_get_entities_at_random() -> None:
     assert approximately_equal(
         entity_counts[entity_factories.orc], (total_entities * 80) / 140
     )
+
+
+def test_tunnel_between() -> None:
+    rng = random.Random(0)
+    for _ in range(10):
+        tunnel = tunnel_between((2, 3), (9, 7), rng)
+        assert tunnel.shape[1] == 2
+        assert tuple(tunnel[0]) == (2, 3)
+        assert tuple(tunnel[-1]) == (9, 7)
+        # Each step moves along a single axis.
+        steps = abs(tunnel[1:] - tunnel[:-1]).sum(axis=1)
+        assert set(steps.tolist()) <= {0, 1}
+
+
+def test_same_seed_generates_same_floor() -> None:
+    def floor_layout(engine: Engine) -> Tuple[bytes, List[Tuple[str, int, int]]]:
+        game_map = engine.game_map
+        return game_map.tiles.tobytes(), sorted((entity.name, entity.x, entity.y) for entity in game_map.entities)
+
+    first = setup_game.new_game(seed=42, prefetch_floors=False)
+    second = setup_game.new_game(seed=42)
+    assert floor_layout(first) == floor_layout(second)
+
+    # Prefetched floors are generated from the same per-floor seed.
+    first.game_world.generate_floor()
+    second.game_world.generate_floor()
+    assert floor_layout(first) == floor_layout(second)
+
+    assert floor_layout(first) != floor_layout(setup_game.new_game(seed=43, prefetch_floors=False))
@@ -0,0 +1,130 @@
+from pathlib import Path
+from typing import Any, List, Tuple
+import lzma
+
+import numpy as np
+import pytest
+
+from components.ai import ConfusedEnemy
+from engine import Engine
+from path_cache import PathCache
+import entity_factories
+import savefile
+import setup_game
+
+
+def new_game() -> Engine:
+    engine = setup_game.new_game(seed=7, prefetch_floors=False)
+    game_map = engine.game_map
+    player = engine.player
+    x, y = player.x, player.y
+
+    orc = entity_factories.orc.spawn(game_map, x + 1, y)
+    orc.ai = ConfusedEnemy(orc, orc.ai, turns_remaining=4)
+    troll = entity_factories.troll.spawn(game_map, x, y + 1)
+    troll.fighter.take_damage(troll.fighter.max_hp)
+    entity_factories.health_potion.spawn(game_map, x, y)
+
+    player.fighter.take_damage(5)
+    player.level.current_xp = 50
+    engine.message_log.add_message("Hello again!")
+    engine.message_log.add_message("Hello again!")
+    return engine
+
+
+def describe(engine: Engine) -> object:
+    """Return the state of a game which should be kept by saving and loading it."""
+    game_map = engine.game_map
+    entities = sorted(
+        (entity.name, entity.x, entity.y, entity.char, entity.blocks_movement, type(getattr(entity, "ai", None)))
+        for entity in game_map.entities
+    )
+    player = engine.player
+    return (
+        entities,
+        game_map.tiles.tobytes(),
+        game_map.explored.tobytes(),
+        game_map.rng.getstate(),
+        (game_map.entrance_location, game_map.downstairs_location),
+        (engine.game_world.seed, engine.game_world.current_floor),
+        (player.fighter.hp, player.fighter.max_hp, player.level.current_xp),
+        [item.name for item in player.inventory.items],
+        (
+            player.equipment.weapon and player.equipment.weapon.name,
+            player.equipment.armor and player.equipment.armor.name,
+        ),
+        [(message.full_text, message.fg) for message in engine.message_log.messages],
+    )
+
+
+@pytest.mark.parametrize("codec", sorted(savefile.CODECS))
+def test_save_and_load(tmp_path: Path, codec: str) -> None:
+    engine = new_game()
+    filename = str(tmp_path / "game.sav")
+    engine.save_as(filename, codec)
+
+    loaded = setup_game.load_game(filename)
+    assert describe(loaded) == describe(engine)
+    assert loaded.player.gamemap is loaded.game_map
+    orc = loaded.game_map.get_actor_at_location(engine.player.x + 1, engine.player.y)
+    assert orc is not None and isinstance(orc.ai, ConfusedEnemy)
+    assert orc.ai.turns_remaining == 4
+    assert (loaded.game_map.path_cost == engine.game_map.path_cost).all()
+
+
+def test_load_memory_mapped(tmp_path: Path) -> None:
+    engine = new_game()
+    filename = str(tmp_path / "game.sav")
+    engine.save_as(filename, "none")
+
+    data = savefile.read(filename, mmap=True)
+    assert isinstance(data.sections["tiles"], np.memmap)
+    assert describe(savefile.restore(data)) == describe(engine)
+
+
+def test_load_rejects_other_files(tmp_path: Path) -> None:
+    filename = tmp_path / "game.sav"
+    filename.write_bytes(lzma.compress(b"An Engine pickled by an older version of the game."))
+    with pytest.raises(ValueError, match="not a save file"):
+        setup_game.load_game(str(filename))
+
+
+def test_path_cache_is_saved(tmp_path: Path) -> None:
+    engine = new_game()
+    engine.game_map.visible[:] = True
+    for _ in range(3):
+        engine.handle_enemy_turns()
+    paths = [(cached.path, cached.costs) for cached in engine.game_map.path_cache]
+    assert paths
+
+    filename = str(tmp_path / "game.sav")
+    engine.save_as(filename)
+    loaded = setup_game.load_game(filename)
+    assert [(cached.path, cached.costs) for cached in loaded.game_map.path_cache] == paths
+
+
+def test_enemy_paths_are_saved(tmp_path: Path) -> None:
+    engine = new_game()
+    game_map = engine.game_map
+    game_map.visible[:] = True
+    for x in range(1, 4):
+        entity_factories.orc.spawn(game_map, engine.player.x + x, engine.player.y + 3)
+    for _ in range(2):
+        engine.handle_enemy_turns()
+
+    def enemy_paths(engine: Engine) -> List[Tuple[Any, ...]]:
+        enemies = [
+            (entity.x, entity.y, savefile._hostile_ai(getattr(entity, "ai", None)))
+            for entity in engine.game_map.entities
+        ]
+        return sorted((x, y, enemy.path, enemy.path_index) for x, y, enemy in enemies if enemy is not None)
+
+    paths = enemy_paths(engine)
+    assert any(path and index > 1 for _, _, path, index in paths)  # Part way along a path.
+    game_map.path_cache = PathCache()  # The paths are still saved once they leave the cache.
+
+    filename = str(tmp_path / "game.sav")
+    engine.save_as(filename)
+    loaded = setup_game.load_game(filename)
+    assert enemy_paths(loaded) == paths
+    assert len(loaded.game_map.path_cache) == 0
@@ -0,0 +1,72 @@
+from pathlib import Path
+from typing import List
+
+from engine import Engine
+from entity import Actor
+import entity_factories
+import setup_game
+
+
+def record_turns(engine: Engine, turns: int) -> List[List[Actor]]:
+    """Play enemy turns and return the actors which acted in each of them, in order."""
+    acted: List[List[Actor]] = []
+    scheduler = engine.game_map.scheduler
+    for _ in range(turns):
+        acted.append(list(scheduler.take_turn()))
+        engine.turn_count += 1
+    return acted
+
+
+def test_speed_and_order() -> None:
+    engine = setup_game.new_game(seed=1, prefetch_floors=False)
+    game_map = engine.game_map
+    for actor in list(game_map.actors):
+        if actor is not engine.player:
+            game_map.remove_entity(actor)
+    assert not len(game_map.scheduler)
+
+    fast = entity_factories.orc.spawn(game_map, 1, 1)
+    fast.speed = 200
+    normal = entity_factories.orc.spawn(game_map, 2, 1)
+    slow = entity_factories.troll.spawn(game_map, 3, 1)
+    slow.speed = 50
+    assert engine.player not in game_map.scheduler
+
+    # Actors due at the same time act in the order they were scheduled in.
+    assert record_turns(engine, 3) == [
+        [fast, normal, slow, fast],
+        [normal, fast, fast],
+        [slow, normal, fast, fast],
+    ]
+
+    normal.fighter.die()
+    assert normal not in game_map.scheduler
+    assert record_turns(engine, 1) == [[fast, fast]]
+
+
+def test_schedule_is_saved(tmp_path: Path) -> None:
+    engine = setup_game.new_game(seed=1, prefetch_floors=False)
+    game_map = engine.game_map
+    x, y = engine.player.x, engine.player.y
+    slow = entity_factories.troll.spawn(game_map, x, y + 1)
+    slow.speed = 50
+    engine.handle_enemy_turns()
+    assert game_map.scheduler.delay_of(slow) == 100
+    dormant = [actor for actor in game_map.actors if game_map.is_dormant(actor)]
+    assert dormant
+
+    filename = str(tmp_path / "game.sav")
+    engine.save_as(filename)
+    loaded = setup_game.load_game(filename)
+    loaded_map = loaded.game_map
+    loaded_slow = loaded_map.get_actor_at_location(x, y + 1)
+    assert loaded_slow is not None
+    assert loaded_map.scheduler.delay_of(loaded_slow) == 100
+    assert [(actor.x, actor.y) for actor in loaded_map.actors if loaded_map.is_dormant(actor)] == [
+        (actor.x, actor.y) for actor in dormant
+    ]
+    ranks = game_map.scheduler.ranks()
+    loaded_ranks = loaded_map.scheduler.ranks()
+    assert sorted((actor.x, actor.y, rank) for actor, rank in ranks.items()) == sorted(
+        (actor.x, actor.y, rank) for actor, rank in loaded_ranks.items()
+    )
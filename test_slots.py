@@ -0,0 +1,32 @@
+import copy
+import pickle
+
+from slots import shallow_copy
+import entity_factories
+import setup_game
+
+
+def test_entities_and_components_have_no_instance_dict() -> None:
+    player = setup_game.new_game(seed=1, prefetch_floors=False).player
+    potion = entity_factories.health_potion.copy()
+    for obj in [player, player.ai, player.fighter, player.inventory, player.equipment, player.level, potion]:
+        assert not hasattr(obj, "__dict__"), obj
+    assert not hasattr(potion.consumable, "__dict__")
+    assert player.equipment.weapon and not hasattr(player.equipment.weapon.equippable, "__dict__")
+
+
+def test_shallow_copy_skips_unset_slots() -> None:
+    template = entity_factories.orc
+    assert not hasattr(template, "parent")
+    clone = shallow_copy(template)
+    assert not hasattr(clone, "parent")
+    assert clone.fighter is template.fighter
+    assert (clone.name, clone.x, clone.prototype_id) == (template.name, template.x, "orc")
+
+
+def test_slotted_entities_copy_and_pickle() -> None:
+    player = setup_game.new_game(seed=1, prefetch_floors=False).player
+    for clone in [copy.deepcopy(player), pickle.loads(pickle.dumps(player))]:
+        assert clone.fighter.hp == player.fighter.hp
+        assert clone.fighter.parent is clone
+        assert clone.equipment.weapon is clone.inventory.items[0]
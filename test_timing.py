@@ -0,0 +1,47 @@
+from pathlib import Path
+import csv
+
+import tcod
+
+import setup_game
+import timing
+
+
+def test_timers_record_only_when_enabled(tmp_path: Path) -> None:
+    engine = setup_game.new_game(seed=1, prefetch_floors=False)
+    timing.histograms.clear()
+    engine.handle_enemy_turns()
+    with timing.measure("test"):
+        pass
+    assert not timing.histograms
+
+    assert timing.toggle()
+    try:
+        for _ in range(3):
+            engine.handle_enemy_turns()
+        engine.render(tcod.Console(80, 50, order="F"))
+        with timing.measure("test"):
+            pass
+    finally:
+        assert not timing.toggle()
+
+    assert timing.histograms["Engine.handle_enemy_turns"].count == 3
+    assert {"Engine.render", "GameMap.render", "MessageLog.render", "test"} <= timing.histograms.keys()
+    summary = timing.histograms["Engine.handle_enemy_turns"].summary()
+    assert 0 < summary["p50"] <= summary["p95"] <= summary["max"]
+
+    timing.render_overlay(tcod.Console(80, 50, order="F"))
+    filename = tmp_path / "timings.csv"
+    timing.export_csv(str(filename))
+    with open(filename, newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert [row["phase"] for row in rows] == list(timing.histograms)
+    timing.histograms.clear()
+
+
+def test_histogram_keeps_a_rolling_window() -> None:
+    histogram = timing.Histogram(size=4)
+    for ms in [100, 1, 2, 3, 4]:
+        histogram.add(ms / 1000)
+    assert histogram.count == 5
+    assert histogram.summary()["max"] == 4
@@ -54,3 +54,7 @@ def new_tile(
     dark=(ord(">"), (0, 0, 100), (50, 50, 150)),
     light=(ord(">"), (255, 255, 255), (200, 180, 50)),
 )
+
+# Every tile type, indexed by the ids used to store maps in save files.  Only append to this so that old saves still
+# load with the right tiles.
+TILES_BY_ID = np.stack([wall, floor, down_stairs])
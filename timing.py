@@ -0,0 +1,139 @@
+"""Per-phase timing of turns and frames, kept as rolling histograms for a debug overlay and CSV export.
+
+Timing is off by default.  While it is off the timers only check `enabled` before calling through, so they can stay
+wrapped around the game's hot paths.
+"""
+from __future__ import annotations
+
+from typing import Any, Callable, ContextManager, Dict, Iterator, TypeVar, cast
+import contextlib
+import csv
+import functools
+import time
+
+from tcod.console import Console
+import numpy as np
+
+import color
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+# The number of recent samples each histogram keeps.
+WINDOW = 256
+
+enabled = False  # If True then timers record their samples.
+
+
+class Histogram:
+    """The durations of the last `size` calls of one phase, in seconds."""
+
+    def __init__(self, size: int = WINDOW):
+        self.samples = np.zeros(size, dtype=np.float64)
+        self.count = 0  # Total number of samples ever recorded.
+
+    def add(self, seconds: float) -> None:
+        self.samples[self.count % len(self.samples)] = seconds
+        self.count += 1
+
+    def recent(self) -> np.ndarray:
+        """Return the samples currently in the window, in no particular order."""
+        return self.samples[: min(self.count, len(self.samples))]
+
+    def summary(self) -> Dict[str, float]:
+        """Return the 50th and 95th percentiles and the maximum of the recent samples, in milliseconds."""
+        recent = self.recent() * 1000
+        if not len(recent):
+            return {"p50": 0.0, "p95": 0.0, "max": 0.0}
+        p50, p95 = np.percentile(recent, [50, 95])
+        return {"p50": float(p50), "p95": float(p95), "max": float(recent.max())}
+
+
+histograms: Dict[str, Histogram] = {}  # Phases in the order they were first recorded.
+
+
+def record(phase: str, seconds: float) -> None:
+    """Add a sample to the histogram of `phase`."""
+    histogram = histograms.get(phase)
+    if histogram is None:
+        histogram = histograms[phase] = Histogram()
+    histogram.add(seconds)
+
+
+@contextlib.contextmanager
+def _measure(phase: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(phase, time.perf_counter() - start)
+
+
+_not_measured = contextlib.nullcontext()
+
+
+def measure(phase: str) -> ContextManager[None]:
+    """Return a context manager which records the time spent inside it to `phase`, if timing is enabled."""
+    return _measure(phase) if enabled else _not_measured
+
+
+def timed(phase: str) -> Callable[[F], F]:
+    """Decorate a function to record the time spent in each call to `phase`, if timing is enabled."""
+
+    def decorator(func: F) -> F:
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if not enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(phase, time.perf_counter() - start)
+
+        return cast(F, wrapper)
+
+    return decorator
+
+
+def toggle() -> bool:
+    """Turn timing and its overlay on or off, and return the new state.  Old samples are dropped when turned on."""
+    global enabled
+    enabled = not enabled
+    if enabled:
+        histograms.clear()
+    return enabled
+
+
+def export_csv(filename: str) -> None:
+    """Write the summary of every phase to a CSV file."""
+    with open(filename, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["phase", "samples", "p50_ms", "p95_ms", "max_ms"])
+        for phase, histogram in histograms.items():
+            summary = histogram.summary()
+            writer.writerow(
+                [
+                    phase,
+                    len(histogram.recent()),
+                    f"{summary['p50']:.4f}",
+                    f"{summary['p95']:.4f}",
+                    f"{summary['max']:.4f}",
+                ]
+            )
+
+
+def render_overlay(console: Console) -> None:
+    """Draw a table of the recorded phases over the top right corner of `console`."""
+    width = 50
+    x = console.width - width
+    console.draw_frame(x, 0, width, len(histograms) + 3, title="Timing (ms)", fg=color.white, bg=color.black)
+    console.print(x + 1, 1, f"{'phase':<26}{'p50':>7}{'p95':>7}{'max':>8}", fg=color.white, bg=color.black)
+    for y, (phase, histogram) in enumerate(histograms.items(), start=2):
+        summary = histogram.summary()
+        console.print(
+            x + 1,
+            y,
+            f"{phase[:25]:<26}{summary['p50']:>7.2f}{summary['p95']:>7.2f}{summary['max']:>8.2f}",
+            fg=color.white,
+            bg=color.black,
+        )